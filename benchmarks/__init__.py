@@ -0,0 +1 @@
+# Benchmarks - Micro-benchmarks for storage, compression, database and parsing hot paths
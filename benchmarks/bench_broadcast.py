@@ -0,0 +1,152 @@
+# Broadcast Benchmarks - Delivery through the rate limiter against a fake Bot API with flood limits
+import asyncio
+import statistics
+import time
+from collections import Counter, deque
+
+SUITE = "broadcast"
+USERS = 300
+# Flood limits of the fake Bot API: messages per second overall, seconds between messages to one chat
+FAKE_LIMIT = 100
+FAKE_PER_CHAT_INTERVAL = 1.0
+
+
+class FakeTelegram:
+    """
+    Stands in for bot.send_message: fixed latency, a global and a per-chat flood
+    limit answered with RetryAfter, and a share of blocked and missing chats.
+    """
+
+    def __init__(self, limit: float = FAKE_LIMIT, per_chat_interval: float = FAKE_PER_CHAT_INTERVAL,
+                 latency: float = 0.02, blocked_every: int = 25, missing_every: int = 40):
+        self.limit = limit
+        self.per_chat_interval = per_chat_interval
+        self.latency = latency
+        self.blocked_every = blocked_every
+        self.missing_every = missing_every
+        self.sent = Counter()
+        self.retry_afters = 0
+        self._window = deque()
+        self._chat_last = {}
+
+    async def __call__(self, chat_id: int, text: str, entities: list) -> None:
+        from telegram.error import BadRequest, Forbidden, RetryAfter
+
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - 1.0:
+            self._window.popleft()
+        last = self._chat_last.get(chat_id)
+        if len(self._window) >= self.limit or (last is not None and now - last < self.per_chat_interval):
+            self.retry_afters += 1
+            raise RetryAfter(1)
+        if chat_id % self.blocked_every == 0:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        if chat_id % self.missing_every == 0:
+            raise BadRequest("Chat not found")
+        self._window.append(now)
+        self._chat_last[chat_id] = now
+        self.sent[chat_id] += 1
+
+
+def _seed_users() -> None:
+    from database.models import SessionLocal, get_engine
+    from database.migrations import migrate
+    from database.crud import UserService
+
+    migrate(get_engine())
+    db = SessionLocal()
+    try:
+        for i in range(USERS):
+            UserService.create_or_get_user(db, 500_000 + i, f"Bench{i}")
+    finally:
+        db.close()
+
+
+def _new_broadcast() -> int:
+    from database.models import SessionLocal
+    from database.broadcasts import BroadcastService
+
+    db = SessionLocal()
+    try:
+        return BroadcastService.create(db, "Benchmark broadcast", None, created_by=1).id
+    finally:
+        db.close()
+
+
+def _engine(rate: float, fake: FakeTelegram):
+    from utils.broadcast import BroadcastEngine
+
+    engine = BroadcastEngine(rate, FAKE_PER_CHAT_INTERVAL, concurrency=8, batch_size=100, max_attempts=3)
+    engine.attach(fake)
+    return engine
+
+
+async def _deliver(rate: float) -> tuple:
+    fake = FakeTelegram()
+    engine = _engine(rate, fake)
+    broadcast_id = _new_broadcast()
+    start = time.perf_counter()
+    engine.launch(broadcast_id)
+    await engine.join(broadcast_id)
+    return time.perf_counter() - start, fake
+
+
+async def _deliver_with_restart(rate: float) -> tuple:
+    """Stop the engine halfway, as a bot restart would, and resume with a fresh one."""
+    fake = FakeTelegram()
+    broadcast_id = _new_broadcast()
+    start = time.perf_counter()
+    engine = _engine(rate, fake)
+    engine.launch(broadcast_id)
+    while sum(fake.sent.values()) < USERS // 2:
+        await asyncio.sleep(0.01)
+    await engine.stop()
+    engine = _engine(rate, fake)
+    engine.resume()
+    await engine.join(broadcast_id)
+    return time.perf_counter() - start, fake
+
+
+def _record(name: str, params: dict, samples: list) -> dict:
+    record = {
+        "suite": SUITE,
+        "name": name,
+        "params": params,
+        "repeat": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    print(f"  {SUITE}.{name} {record['params']}: median {record['median'] * 1000:.3f} ms "
+          f"(min {record['min'] * 1000:.3f} ms, n={len(samples)})")
+    return record
+
+
+def run(repeat: int = 5) -> list:
+    from database.models import SessionLocal, Broadcast
+
+    _seed_users()
+    records = []
+    # Below the fake limit, then above it so delivery depends on RetryAfter handling
+    for name, rate, simulate in (
+        ("deliver", FAKE_LIMIT * 0.8, _deliver),
+        ("deliver_over_limit", FAKE_LIMIT * 3, _deliver),
+        ("deliver_with_restart", FAKE_LIMIT * 0.8, _deliver_with_restart),
+    ):
+        samples = []
+        for _ in range(repeat):
+            seconds, fake = asyncio.run(simulate(rate))
+            samples.append(seconds)
+        duplicates = sum(count - 1 for count in fake.sent.values())
+        db = SessionLocal()
+        try:
+            broadcast = db.query(Broadcast).order_by(Broadcast.id.desc()).first()
+            counters = (broadcast.delivered, broadcast.failed, broadcast.blocked, broadcast.status)
+        finally:
+            db.close()
+        print(f"    last run: {sum(fake.sent.values())} messages, {fake.retry_afters} flood waits, "
+              f"{duplicates} duplicates; delivered/failed/blocked {counters[:3]}, {counters[3]}")
+        records.append(_record(name, {"users": USERS, "rate": rate, "fake_limit": FAKE_LIMIT}, samples))
+    return records
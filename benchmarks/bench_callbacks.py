@@ -0,0 +1,78 @@
+# Callback Benchmarks - Encoding, decoding and dispatch cost of callback_data
+import asyncio
+
+from benchmarks.common import measure
+
+SUITE = "callbacks"
+ITERATIONS = 10_000
+
+
+class _FakeQuery:
+    def __init__(self, data):
+        self.data = data
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+class _FakeUser:
+    id = 424242
+
+
+class _FakeUpdate:
+    def __init__(self, data):
+        self.callback_query = _FakeQuery(data)
+        self.effective_user = _FakeUser()
+
+
+def run(repeat: int = 5) -> list:
+    from utils.callback_data import CallbackRouter
+
+    router = CallbackRouter("benchmark")
+
+    async def noop(update, context, *args):
+        pass
+
+    router.register("d", noop)
+    router.register("p", noop, arity=2)
+    router.register_static("main_menu", noop)
+
+    user_id = _FakeUser.id
+    valid = router.encode("d", user_id, 123_456)
+    paged = router.encode("p", user_id, 123_456, 1_700_000_000)
+    forged = valid[:-1] + ("0" if valid[-1] != "0" else "1")
+    other_user = router.encode("d", user_id + 1, 123_456)
+    stale_router = CallbackRouter("benchmark", max_age_hours=-1)
+    stale_router.register("d", noop)
+
+    def loop(fn, *args):
+        def run_loop():
+            for _ in range(ITERATIONS):
+                fn(*args)
+        return run_loop
+
+    params = {"iterations": ITERATIONS, "payload_bytes": len(valid)}
+    records = [
+        measure(SUITE, "encode", loop(router.encode, "d", user_id, 123_456), params=params, repeat=repeat),
+        measure(SUITE, "resolve.static", loop(router.resolve, "main_menu", user_id), params=params, repeat=repeat),
+        measure(SUITE, "resolve.valid", loop(router.resolve, valid, user_id), params=params, repeat=repeat),
+        measure(SUITE, "resolve.paged", loop(router.resolve, paged, user_id),
+                params=dict(params, payload_bytes=len(paged)), repeat=repeat),
+        measure(SUITE, "resolve.forged", loop(router.resolve, forged, user_id), params=params, repeat=repeat),
+        measure(SUITE, "resolve.other_user", loop(router.resolve, other_user, user_id),
+                params=params, repeat=repeat),
+        measure(SUITE, "resolve.stale", loop(stale_router.resolve, valid, user_id), params=params, repeat=repeat),
+        measure(SUITE, "resolve.unknown", loop(router.resolve, "download_project_5", user_id),
+                params=params, repeat=repeat),
+    ]
+
+    # The body of handle_callback with a no-op handler, per ITERATIONS clicks
+    async def dispatch_many():
+        for _ in range(ITERATIONS):
+            update = _FakeUpdate(valid)
+            route, args = router.resolve(update.callback_query.data, update.effective_user.id)
+            await route.handler(update, None, *args)
+
+    records.append(measure(SUITE, "dispatch", lambda: asyncio.run(dispatch_many()),
+                           params=params, repeat=repeat))
+    return records
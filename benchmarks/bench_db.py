@@ -0,0 +1,119 @@
+# Database Benchmarks - UserService and ProjectService queries at increasing table sizes
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import WORK_DIR, measure
+
+SUITE = "db"
+
+# Projects are spread over owners so per-user lists have a realistic length
+PROJECTS_PER_USER = 20
+SEED_CHUNK = 50_000
+
+
+def _seed(engine, rows: int) -> None:
+    """Insert `rows` users and `rows` projects with bulk executemany inserts."""
+    from database.models import User, Project
+
+    base_time = datetime(2024, 1, 1)
+    owners = max(1, rows // PROJECTS_PER_USER)
+    with engine.begin() as conn:
+        for start in range(0, rows, SEED_CHUNK):
+            stop = min(rows, start + SEED_CHUNK)
+            conn.execute(insert(User), [
+                {
+                    "id": i + 1,
+                    "telegram_id": 10_000_000 + i,
+                    "first_name": f"User{i}",
+                    "username": f"user{i}",
+                    "created_at": base_time + timedelta(seconds=i),
+                    "is_banned": False,
+                }
+                for i in range(start, stop)
+            ])
+            conn.execute(insert(Project), [
+                {
+                    "id": i + 1,
+                    "user_id": (i % owners) + 1,
+                    "name": f"project-{i}",
+                    "description": f"Synthetic project number {i} used for benchmarking queries.",
+                    "file_path": f"/storage/user_{(i % owners) + 1}/project_{i}",
+                    "created_at": base_time + timedelta(seconds=i),
+                    "updated_at": base_time + timedelta(seconds=i),
+                }
+                for i in range(start, stop)
+            ])
+
+
+def run(repeat: int = 5, sizes=(10_000, 100_000, 1_000_000), full_scan_limit: int = 100_000) -> list:
+    from database.models import Base
+    from database.crud import UserService, ProjectService
+
+    records = []
+    rng = random.Random(0)
+
+    for rows in sizes:
+        db_path = os.path.join(WORK_DIR, f"bench_db_{rows}.db")
+        engine = create_engine(f"sqlite:///{db_path}", echo=False)
+        Base.metadata.create_all(bind=engine)
+        print(f"  seeding {rows} users and projects...")
+        _seed(engine, rows)
+
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        owners = max(1, rows // PROJECTS_PER_USER)
+        params = {"rows": rows}
+
+        def with_session(fn):
+            def call(*args):
+                db = Session()
+                try:
+                    return fn(db, *args)
+                finally:
+                    db.close()
+            return call
+
+        records.append(measure(
+            SUITE, "get_user_by_telegram_id", with_session(UserService.get_user_by_telegram_id),
+            params=params, repeat=repeat,
+            setup=lambda: (10_000_000 + rng.randrange(rows),),
+        ))
+        records.append(measure(
+            SUITE, "create_or_get_user.existing", with_session(UserService.create_or_get_user),
+            params=params, repeat=repeat,
+            setup=lambda: (10_000_000 + rng.randrange(rows), "Bench"),
+        ))
+        records.append(measure(
+            SUITE, "get_user_projects", with_session(ProjectService.get_user_projects),
+            params=params, repeat=repeat,
+            setup=lambda: (rng.randrange(owners) + 1,),
+        ))
+        records.append(measure(
+            SUITE, "get_user_projects_page", with_session(ProjectService.get_user_projects_page),
+            params=params, repeat=repeat,
+            setup=lambda: (rng.randrange(owners) + 1, 10),
+        ))
+        records.append(measure(
+            SUITE, "get_project", with_session(ProjectService.get_project),
+            params=params, repeat=repeat,
+            setup=lambda: (rng.randrange(rows) + 1,),
+        ))
+
+        # Full-table loads are linear in the table size; skip them on huge tables by default
+        if rows <= full_scan_limit:
+            records.append(measure(
+                SUITE, "get_all_users", with_session(UserService.get_all_users),
+                params=params, repeat=min(repeat, 3),
+            ))
+            records.append(measure(
+                SUITE, "get_all_projects", with_session(ProjectService.get_all_projects),
+                params=params, repeat=min(repeat, 3),
+            ))
+
+        engine.dispose()
+        os.remove(db_path)
+
+    return records
@@ -0,0 +1,34 @@
+# JSON Benchmarks - Parsing large model responses into project structures
+import json
+
+from benchmarks.common import measure, make_project_structure
+
+SUITE = "json"
+
+
+def _model_response(shape: str, copies: int) -> str:
+    """Build a response the way the model returns it: prose around a fenced JSON object."""
+    structure = {}
+    for copy in range(copies):
+        for path, content in make_project_structure(shape, seed=copy).items():
+            structure[f"part{copy}/{path}"] = content
+    payload = {
+        "project_name": "Benchmark Project",
+        "structure": structure,
+        "summary": "Synthetic response used for benchmarking",
+    }
+    return "Here is your project:\n```json\n" + json.dumps(payload, indent=2) + "\n```\nEnjoy!"
+
+
+def run(repeat: int = 5) -> list:
+    from ai_generator.response_parser import extract_json
+
+    records = []
+    for shape, copies in (("mixed", 1), ("many_small", 1), ("mixed", 8), ("few_large", 2)):
+        text = _model_response(shape, copies)
+        records.append(measure(
+            SUITE, "extract_json", extract_json,
+            params={"shape": shape, "copies": copies, "bytes": len(text.encode("utf-8"))},
+            repeat=repeat, setup=lambda: (text,),
+        ))
+    return records
@@ -0,0 +1,91 @@
+# Scheduler Benchmarks - Queue wait of light users while heavy users flood generation
+import asyncio
+import statistics
+
+SUITE = "scheduler"
+
+SLOTS = 2
+JOB_SECONDS = 0.005
+HEAVY_USERS = 3
+HEAVY_JOBS = 20
+LIGHT_USERS = 10
+
+
+def _p95(values: list) -> float:
+    return sorted(values)[max(0, int(len(values) * 0.95) - 1)]
+
+
+async def _fifo_run() -> list:
+    """Baseline: first come, first served over a shared queue."""
+    queue = asyncio.Queue()
+    waits = []
+    loop = asyncio.get_running_loop()
+
+    async def worker():
+        while True:
+            user, queued_at = await queue.get()
+            if user == "light":
+                waits.append(loop.time() - queued_at)
+            await asyncio.sleep(JOB_SECONDS)
+            queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(SLOTS)]
+    for _ in range(HEAVY_USERS * HEAVY_JOBS):
+        queue.put_nowait(("heavy", loop.time()))
+    for _ in range(LIGHT_USERS):
+        queue.put_nowait(("light", loop.time()))
+    await queue.join()
+    for task in workers:
+        task.cancel()
+    return waits
+
+
+async def _fair_run() -> list:
+    from utils.scheduler import FairScheduler, NORMAL
+
+    scheduler = FairScheduler(SLOTS, {NORMAL: 1}, max_queued_per_user=HEAVY_JOBS)
+    loop = asyncio.get_running_loop()
+    waits = []
+
+    def job(light: bool):
+        queued_at = loop.time()
+
+        async def run():
+            if light:
+                waits.append(loop.time() - queued_at)
+            await asyncio.sleep(JOB_SECONDS)
+        return run
+
+    jobs = []
+    for user in range(HEAVY_USERS):
+        jobs += [scheduler.submit(user, job(False)) for _ in range(HEAVY_JOBS)]
+    for user in range(LIGHT_USERS):
+        jobs.append(scheduler.submit(1000 + user, job(True)))
+    await asyncio.gather(*(j.future for j in jobs))
+    await scheduler.stop()
+    return waits
+
+
+def _record(name: str, samples: list, repeat: int) -> dict:
+    record = {
+        "suite": SUITE,
+        "name": name,
+        "params": {"slots": SLOTS, "heavy_jobs": HEAVY_USERS * HEAVY_JOBS, "light_users": LIGHT_USERS},
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    print(f"  {SUITE}.{name} {record['params']}: median {record['median'] * 1000:.3f} ms "
+          f"(min {record['min'] * 1000:.3f} ms, n={repeat})")
+    return record
+
+
+def run(repeat: int = 5) -> list:
+    """Each sample is the p95 queue wait of the light users in one simulated flood."""
+    records = []
+    for name, simulate in (("light_user_wait_p95.fifo", _fifo_run), ("light_user_wait_p95.fair", _fair_run)):
+        samples = [_p95(asyncio.run(simulate())) for _ in range(repeat)]
+        records.append(_record(name, samples, repeat))
+    return records
@@ -0,0 +1,89 @@
+# Search Benchmarks - FTS5 project search at increasing numbers of projects
+import os
+import random
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import WORK_DIR, measure
+
+SUITE = "search"
+SEED_CHUNK = 50_000
+PROJECTS_PER_USER = 20
+
+_STACKS = ["flask", "fastapi", "django", "react", "vue", "telegram", "discord", "express", "spring", "rails"]
+_KINDS = ["api", "bot", "dashboard", "shop", "blog", "tracker", "scraper", "chat", "game", "crm"]
+
+
+def _vocabulary(rng: random.Random, size: int = 5_000) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def _seed(engine, rows: int, rng: random.Random) -> None:
+    from database.models import User, Project
+
+    vocab = _vocabulary(rng)
+    owners = max(1, rows // PROJECTS_PER_USER)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i + 1, "telegram_id": 10_000_000 + i, "first_name": f"User{i}"} for i in range(owners)
+        ])
+        for start in range(0, rows, SEED_CHUNK):
+            batch = []
+            for i in range(start, min(rows, start + SEED_CHUNK)):
+                stack, kind = rng.choice(_STACKS), rng.choice(_KINDS)
+                # Zipf-like word choice: a few words are common, most are rare
+                words = [vocab[min(int(rng.paretovariate(1.2)) - 1, len(vocab) - 1)] for _ in range(20)]
+                batch.append({
+                    "id": i + 1,
+                    "user_id": (i % owners) + 1,
+                    "name": f"{stack}-{kind}-{i}",
+                    "description": f"A {stack} {kind} " + " ".join(words),
+                    "file_path": f"/storage/{i}",
+                })
+            conn.execute(insert(Project), batch)
+
+
+def run(repeat: int = 5, sizes=(10_000, 100_000, 1_000_000)) -> list:
+    from database.models import Base
+    from database.search import SearchService, create_search_index
+
+    records = []
+    rng = random.Random(0)
+
+    for rows in sizes:
+        db_path = os.path.join(WORK_DIR, f"bench_search_{rows}.db")
+        engine = create_engine(f"sqlite:///{db_path}", echo=False)
+        Base.metadata.create_all(bind=engine)
+        print(f"  seeding and indexing {rows} projects...")
+        _seed(engine, rows, rng)
+        with engine.begin() as conn:
+            create_search_index(conn)
+
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        SearchService._fts_enabled = None
+        owners = max(1, rows // PROJECTS_PER_USER)
+
+        def search(query, user_id=None, offset=0):
+            db = Session()
+            try:
+                return SearchService.search_projects(db, query, user_id=user_id, limit=8, offset=offset)
+            finally:
+                db.close()
+
+        cases = [
+            ("user.common", lambda: ("flask api", rng.randrange(owners) + 1)),
+            ("user.prefix", lambda: ("dja", rng.randrange(owners) + 1)),
+            ("global.rare", lambda: (f"{rng.choice(_STACKS)}-{rng.choice(_KINDS)}-{rng.randrange(rows)}",)),
+            ("global.selective", lambda: ("django shop",)),
+            ("global.common", lambda: ("flask",)),
+            ("global.common.page10", lambda: ("flask", None, 80)),
+        ]
+        for name, setup in cases:
+            records.append(measure(SUITE, name, search, params={"rows": rows}, repeat=repeat, setup=setup))
+
+        engine.dispose()
+        os.remove(db_path)
+
+    return records
@@ -0,0 +1,49 @@
+# Startup Benchmarks - Cold import of handler modules and the application bootstrap
+import os
+import subprocess
+import sys
+
+from benchmarks.common import SRC_DIR, WORK_DIR, measure
+
+SUITE = "startup"
+
+# Each snippet runs in a fresh interpreter, so module caches never help
+SNIPPETS = {
+    "import_handlers": (
+        "import handlers.start_handler, handlers.project_view_handler, "
+        "handlers.project_creation_handler, handlers.admin_handler"
+    ),
+    "build_application": "import main; main.build_application()",
+    "bootstrap": "import bootstrap; bootstrap.bootstrap()",
+    "first_generator": "from ai_generator.gemini_generator import get_generator; get_generator()",
+}
+
+
+def _run_snippet(code: str) -> None:
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True, cwd=SRC_DIR, env=env,
+                   stdout=subprocess.DEVNULL)
+
+
+def run(repeat: int = 5) -> list:
+    records = []
+    interpreter = measure(SUITE, "interpreter", _run_snippet, repeat=repeat, setup=lambda: ("pass",))
+    records.append(interpreter)
+
+    for name, code in SNIPPETS.items():
+        if name == "bootstrap":
+            # Fresh database on every run so migrations are part of the cold start
+            def fresh_db():
+                db_path = os.path.join(WORK_DIR, "startup.db")
+                if os.path.exists(db_path):
+                    os.remove(db_path)
+                os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+                return (code,)
+            setup = fresh_db
+        else:
+            setup = lambda code=code: (code,)
+        try:
+            records.append(measure(SUITE, name, _run_snippet, repeat=repeat, setup=setup))
+        except subprocess.CalledProcessError as e:
+            print(f"  {SUITE}.{name}: skipped ({e})")
+    return records
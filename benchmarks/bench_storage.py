@@ -0,0 +1,66 @@
+# Storage Benchmarks - save_project_files, compress_project, get_projects_size
+import itertools
+import os
+import shutil
+
+from benchmarks.common import measure, make_project_structure, structure_size
+
+SUITE = "storage"
+
+
+def run(repeat: int = 5) -> list:
+    from config import PROJECTS_STORAGE_DIR
+    from utils.storage import StorageManager
+
+    records = []
+    counter = itertools.count()
+
+    for shape in ("many_small", "few_large", "mixed"):
+        structure = make_project_structure(shape)
+        params = {
+            "shape": shape,
+            "files": len(structure),
+            "bytes": structure_size(structure),
+        }
+
+        def fresh_dir():
+            return (os.path.join(PROJECTS_STORAGE_DIR, "bench_save", f"p{next(counter)}"), structure)
+
+        records.append(measure(
+            SUITE, "save_project_files", StorageManager.save_project_files,
+            params=params, repeat=repeat, setup=fresh_dir,
+            teardown=lambda args, _: shutil.rmtree(args[0], ignore_errors=True),
+        ))
+
+        # Compression works on a project already on disk
+        project_dir = os.path.join(PROJECTS_STORAGE_DIR, "bench_compress", shape)
+        StorageManager.save_project_files(project_dir, structure)
+
+        def remove_zip(args, zip_path):
+            if zip_path and os.path.exists(zip_path):
+                os.remove(zip_path)
+
+        records.append(measure(
+            SUITE, "compress_project", StorageManager.compress_project,
+            params=params, repeat=repeat, setup=lambda: (project_dir,), teardown=remove_zip,
+        ))
+        shutil.rmtree(project_dir, ignore_errors=True)
+
+    # Disk usage of a user with many projects
+    structure = make_project_structure("mixed")
+    for project_count in (10, 50):
+        paths = []
+        for n in range(project_count):
+            project_dir = StorageManager.project_directory(900_000 + n, f"bench{n}")
+            StorageManager.save_project_files(project_dir, structure)
+            paths.append(project_dir)
+
+        records.append(measure(
+            SUITE, "get_projects_size", StorageManager.get_projects_size,
+            params={"projects": project_count, "files": project_count * len(structure)},
+            repeat=repeat, setup=lambda: (paths,),
+        ))
+        for project_dir in paths:
+            shutil.rmtree(os.path.dirname(project_dir), ignore_errors=True)
+
+    return records
@@ -0,0 +1,86 @@
+# Worker Benchmarks - Archive job throughput through the jobs table with 1..N worker processes
+import multiprocessing
+import os
+import time
+
+from benchmarks.common import measure, make_project_structure
+
+SUITE = "workers"
+JOBS = 32
+
+
+def _child(index: int) -> None:
+    import signal
+    import threading
+    from workers.worker import run_worker
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    run_worker(f"bench:{os.getpid()}:{index}", poll_interval=0.01, stop=stop)
+
+
+def _seed_projects(count: int) -> list:
+    from database.models import SessionLocal
+    from database.crud import UserService, ProjectService
+    from utils.storage import StorageManager
+
+    db = SessionLocal()
+    try:
+        user = UserService.create_or_get_user(db, 424242, "Bench")
+        project_ids = []
+        for i in range(count):
+            staging_dir = StorageManager.create_staging_directory()
+            StorageManager.save_project_files(staging_dir, make_project_structure("mixed", seed=i))
+            project = ProjectService.create_project(
+                db, user.id, f"bench{i}", "benchmark project",
+                place_files=lambda project_id: StorageManager.publish_project_directory(
+                    staging_dir, project_id, f"bench{i}"),
+            )
+            project_ids.append(project.id)
+        return project_ids
+    finally:
+        db.close()
+
+
+def run(repeat: int = 5, worker_counts=(1, 2, 4)) -> list:
+    from database.models import SessionLocal, get_engine
+    from database.migrations import migrate
+    from database.job_queue import JobQueue, QUEUED, RUNNING
+    from workers.tasks import ARCHIVE
+
+    migrate(get_engine())
+    project_ids = _seed_projects(JOBS)
+    ctx = multiprocessing.get_context("spawn")
+    records = []
+
+    def run_batch():
+        db = SessionLocal()
+        try:
+            for project_id in project_ids:
+                JobQueue.enqueue(db, ARCHIVE, {"project_id": project_id})
+            while True:
+                counts = JobQueue.counts(db)
+                if not counts.get(QUEUED) and not counts.get(RUNNING):
+                    return
+                time.sleep(0.005)
+        finally:
+            db.close()
+
+    for workers in worker_counts:
+        processes = [ctx.Process(target=_child, args=(index,)) for index in range(workers)]
+        for process in processes:
+            process.start()
+        # Let the workers import everything and start polling before timing
+        time.sleep(2.0)
+
+        record = measure(SUITE, "archive_batch", run_batch,
+                         params={"workers": workers, "jobs": JOBS, "cpus": os.cpu_count()}, repeat=repeat)
+        print(f"    {JOBS / record['median']:.1f} jobs/s")
+        records.append(record)
+
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+    return records
@@ -0,0 +1,160 @@
+# Benchmark Common - Environment setup, timing harness, fixtures and result files
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Scratch space for the whole run; storage and databases live here
+WORK_DIR = tempfile.mkdtemp(prefix="pbb_bench_")
+
+
+def setup_environment() -> None:
+    """
+    Point the application modules at scratch storage and make them importable.
+    Must run before anything under src/ is imported.
+    """
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("ADMIN_IDS", "1")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+    os.environ["PROJECTS_STORAGE_DIR"] = os.path.join(WORK_DIR, "projects_storage")
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+
+def measure(suite: str, name: str, fn, *, params: dict = None, repeat: int = 5,
+            setup=None, teardown=None) -> dict:
+    """
+    Time fn over `repeat` runs and return a result record.
+    setup() returns the positional arguments for fn; teardown(args, result)
+    runs after each timed call. Neither is included in the timing.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+        if teardown:
+            teardown(args, result)
+
+    record = {
+        "suite": suite,
+        "name": name,
+        "params": params or {},
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+    print(f"  {suite}.{name} {record['params']}: median {record['median'] * 1000:.3f} ms "
+          f"(min {record['min'] * 1000:.3f} ms, n={repeat})")
+    return record
+
+
+def result_key(record: dict) -> str:
+    """Stable identity of a result, used to match records across runs."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(record["params"].items()))
+    return f"{record['suite']}.{record['name']}[{params}]"
+
+
+# ---------------------------------------------------------------------------
+# Synthetic project fixtures
+# ---------------------------------------------------------------------------
+
+_WORDS = (
+    "def class return import from self value result config request response "
+    "user project file path data items index name status error handler "
+    "async await for in if else elif try except with as None True False"
+).split()
+
+# shape name -> list of (directory depth, file count, approximate file size in bytes)
+PROJECT_SHAPES = {
+    # A typical web app: lots of small modules, templates and static files
+    "many_small": [(2, 300, 1_500), (3, 100, 4_000)],
+    # Data or asset heavy project: a handful of big files
+    "few_large": [(0, 2, 512_000), (1, 3, 2_000_000)],
+    # What the generator usually returns
+    "mixed": [(1, 30, 2_500), (2, 10, 8_000), (0, 1, 300_000)],
+}
+
+
+def _source_text(rng: random.Random, size: int) -> str:
+    """Generate code-like text of roughly `size` characters."""
+    lines = []
+    length = 0
+    while length < size:
+        indent = "    " * rng.randint(0, 3)
+        line = indent + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12)))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def make_project_structure(shape: str, seed: int = 0) -> dict:
+    """
+    Build a files_structure dict (relative path -> content) of the given shape,
+    in the same form the generator returns it.
+    """
+    rng = random.Random(seed)
+    structure = {}
+    for depth, count, size in PROJECT_SHAPES[shape]:
+        for i in range(count):
+            parts = [f"pkg{rng.randint(0, 5)}" for _ in range(depth)]
+            ext = rng.choice((".py", ".js", ".html", ".css", ".md", ".json"))
+            path = "/".join(parts + [f"file_{depth}_{i}{ext}"])
+            structure[path] = _source_text(rng, size)
+    structure["README.md"] = _source_text(rng, 2_000)
+    return structure
+
+
+def structure_size(structure: dict) -> int:
+    """Total number of characters in a files_structure dict."""
+    return sum(len(content) for content in structure.values())
+
+
+# ---------------------------------------------------------------------------
+# Result files
+# ---------------------------------------------------------------------------
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(records: list, output_path: str = None) -> str:
+    """Write benchmark records and run metadata to a JSON file and return its path."""
+    commit = _git_commit()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if not output_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(RESULTS_DIR, f"{timestamp}_{commit}.json")
+
+    payload = {
+        "meta": {
+            "commit": commit,
+            "timestamp": timestamp,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": records,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return output_path
@@ -0,0 +1,51 @@
+# Benchmark Comparison - Diff two result files and flag regressions
+#
+# Usage (from the repository root):
+#   python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+import argparse
+import json
+import sys
+
+from benchmarks.common import result_key
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    return payload["meta"], {result_key(record): record for record in payload["results"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown of the median counted as a regression (%(default)s)")
+    args = parser.parse_args(argv)
+
+    base_meta, baseline = _load(args.baseline)
+    cand_meta, candidate = _load(args.candidate)
+    print(f"baseline {base_meta['commit']} ({base_meta['timestamp']}) -> "
+          f"candidate {cand_meta['commit']} ({cand_meta['timestamp']})\n")
+
+    regressions = 0
+    for key in sorted(set(baseline) | set(candidate)):
+        if key not in baseline or key not in candidate:
+            print(f"  {'only in ' + ('baseline' if key in baseline else 'candidate'):<20} {key}")
+            continue
+        old, new = baseline[key]["median"], candidate[key]["median"]
+        change = (new - old) / old if old else 0.0
+        marker = ""
+        if change > args.threshold:
+            marker = "  <-- REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            marker = "  (faster)"
+        print(f"  {change:+8.1%}  {old * 1000:10.3f} ms -> {new * 1000:10.3f} ms  {key}{marker}")
+
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
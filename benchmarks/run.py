@@ -0,0 +1,76 @@
+# Benchmark Runner - Run the benchmark suites and store results as JSON
+#
+# Usage (from the repository root):
+#   python -m benchmarks.run
+#   python -m benchmarks.run --suites storage,json --repeat 10
+#   python -m benchmarks.run --db-sizes 10000,100000 --output results.json
+import argparse
+import shutil
+
+from benchmarks.common import WORK_DIR, save_results, setup_environment
+
+SUITES = ("storage", "db", "json", "startup", "callbacks", "search", "scheduler", "workers", "broadcast")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run Project Builder Bot benchmarks")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help="comma-separated suites to run (%(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--db-sizes", default="10000,100000,1000000",
+                        help="comma-separated table sizes for the db and search suites (%(default)s)")
+    parser.add_argument("--full-scan-limit", type=int, default=100_000,
+                        help="largest table size for get_all_* benchmarks (%(default)s)")
+    parser.add_argument("--worker-counts", default="1,2,4",
+                        help="comma-separated worker process counts for the workers suite (%(default)s)")
+    parser.add_argument("--output", help="result file path (default: benchmarks/results/<time>_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    setup_environment()
+    records = []
+    try:
+        for suite in args.suites.split(","):
+            suite = suite.strip()
+            print(f"[{suite}]")
+            if suite == "storage":
+                from benchmarks import bench_storage
+                records += bench_storage.run(repeat=args.repeat)
+            elif suite == "db":
+                from benchmarks import bench_db
+                sizes = [int(size) for size in args.db_sizes.split(",") if size.strip()]
+                records += bench_db.run(repeat=args.repeat, sizes=sizes,
+                                        full_scan_limit=args.full_scan_limit)
+            elif suite == "json":
+                from benchmarks import bench_json
+                records += bench_json.run(repeat=args.repeat)
+            elif suite == "search":
+                from benchmarks import bench_search
+                sizes = [int(size) for size in args.db_sizes.split(",") if size.strip()]
+                records += bench_search.run(repeat=args.repeat, sizes=sizes)
+            elif suite == "callbacks":
+                from benchmarks import bench_callbacks
+                records += bench_callbacks.run(repeat=args.repeat)
+            elif suite == "scheduler":
+                from benchmarks import bench_scheduler
+                records += bench_scheduler.run(repeat=args.repeat)
+            elif suite == "workers":
+                from benchmarks import bench_workers
+                counts = [int(count) for count in args.worker_counts.split(",") if count.strip()]
+                records += bench_workers.run(repeat=args.repeat, worker_counts=counts)
+            elif suite == "broadcast":
+                from benchmarks import bench_broadcast
+                records += bench_broadcast.run(repeat=args.repeat)
+            elif suite == "startup":
+                from benchmarks import bench_startup
+                records += bench_startup.run(repeat=args.repeat)
+            else:
+                parser.error(f"unknown suite: {suite}")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    path = save_results(records, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
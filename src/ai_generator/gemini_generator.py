@@ -1,14 +1,19 @@
 # AI Generator Module - Gemini AI integration for project generation
-import google.generativeai as genai
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, SCAFFOLDS_ENABLED, SCAFFOLD_MIN_SCORE
+from ai_generator.response_parser import extract_json
+from ai_generator.scaffolds import library as scaffold_library, Scaffold
+from utils import metrics, tracing
 import json
-
-genai.configure(api_key=GEMINI_API_KEY)
+import time
 
 class ProjectGenerator:
     def __init__(self):
+        # Imported here: the client library is heavy and only needed once generating
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
     
+    @tracing.traced("generator.generate_project")
     def generate_project(self, project_name: str, description: str) -> dict:
         """
         Generate a complete project structure based on description.
@@ -47,23 +52,9 @@ Important:
 - Include setup/installation instructions in README
 """
         
-        response = self.model.generate_content(prompt)
-        
         try:
-            # Extract JSON from response
-            response_text = response.text
-            # Try to find JSON in the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = response_text[start_idx:end_idx]
-                result = json.loads(json_str)
-                return result
-            else:
-                raise ValueError("No JSON found in response")
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            print(f"Response: {response.text}")
+            return self._complete(prompt, mode="full")
+        except json.JSONDecodeError:
             return {
                 "project_name": project_name,
                 "structure": {
@@ -73,11 +64,97 @@ Important:
                 "summary": "Error in generation, basic structure created"
             }
     
+    @tracing.traced("generator.generate_on_scaffold")
+    def generate_on_scaffold(self, project_name: str, description: str, scaffold: Scaffold) -> dict:
+        """
+        Generate a project on top of a stored scaffold. The model sees the
+        scaffold and only returns new files, full replacements of scaffold
+        files it changes, and scaffold files to delete.
+        """
+        base = scaffold_library.render(scaffold.name, project_name, description)
+        listing = "\n\n".join(f"--- {path} ---\n{content}" for path, content in base.items())
+        prompt = f"""
+You are an expert software architect. A project skeleton ({scaffold.title}) already exists.
+Extend it into a complete, production-ready project based on this description:
+
+Project Name: {project_name}
+Description: {description}
+
+Existing skeleton files:
+
+{listing}
+
+Return ONLY what changes, in this exact JSON format:
+{{
+    "structure": {{
+        "new/file_path": "content",
+        "existing/file_path": "complete new content of a skeleton file you change"
+    }},
+    "delete": ["skeleton file paths to remove, if any"],
+    "summary": "Brief summary of what was generated"
+}}
+
+Important:
+- Do NOT repeat skeleton files you leave unchanged
+- Changed files must contain their complete new content, not a diff
+- Add every file the features need: code, templates, models, tests
+- Update README and dependency files if you add features or dependencies
+- Code should be complete and functional, with proper comments
+"""
+        
+        try:
+            patch = self._complete(prompt, mode="scaffold")
+        except json.JSONDecodeError:
+            patch = {"summary": f"Error in generation, {scaffold.title} skeleton created"}
+        
+        changes = patch.get("structure") or {}
+        for path in patch.get("delete") or []:
+            base.pop(path, None)
+        base.update(changes)
+        metrics.inc("scaffold_generations_total", scaffold=scaffold.name)
+        return {
+            "project_name": project_name,
+            "structure": base,
+            "summary": patch.get("summary") or f"{scaffold.title} project generated",
+            "scaffold": scaffold.name,
+        }
+    
+    def _complete(self, prompt: str, mode: str) -> dict:
+        """Run one generation and parse its JSON. Raises json.JSONDecodeError on unusable output."""
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt)
+        metrics.observe("gemini_seconds", time.perf_counter() - start, mode=mode)
+        
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            metrics.observe("gemini_prompt_tokens", getattr(usage, "prompt_token_count", 0) or 0, mode=mode)
+            metrics.observe("gemini_output_tokens", getattr(usage, "candidates_token_count", 0) or 0, mode=mode)
+        
+        try:
+            # Extract JSON from response
+            return extract_json(response.text)
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing error: {e}")
+            print(f"Response: {response.text}")
+            raise
+    
     def generate_project_files(self, project_name: str, description: str) -> dict:
         """
-        Wrapper method to generate project files.
+        Generate project files, starting from a scaffold when the description
+        clearly matches one of the stored stacks.
         """
+        if SCAFFOLDS_ENABLED:
+            scaffold = scaffold_library.classify(project_name, description, SCAFFOLD_MIN_SCORE)
+            if scaffold is not None:
+                return self.generate_on_scaffold(project_name, description, scaffold)
         return self.generate_project(project_name, description)
 
-# Initialize generator
-generator = ProjectGenerator()
+_generator = None
+
+def get_generator() -> ProjectGenerator:
+    """Return the shared generator, creating it on first use."""
+    global _generator
+    if _generator is None:
+        _generator = ProjectGenerator()
+    return _generator
+
@@ -0,0 +1,15 @@
+# Response Parser - Extract the project JSON from raw model output
+import json
+
+
+def extract_json(response_text: str) -> dict:
+    """
+    Extract the outermost JSON object from a model response.
+    Raises ValueError if no JSON object is present and
+    json.JSONDecodeError if the object is malformed.
+    """
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    if start_idx == -1 or end_idx <= start_idx:
+        raise ValueError("No JSON found in response")
+    return json.loads(response_text[start_idx:end_idx])
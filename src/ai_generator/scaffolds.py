@@ -0,0 +1,178 @@
+# Scaffolds - Pre-built project skeletons and a keyword classifier that picks one
+import hashlib
+import html
+import json
+import re
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+
+LIBRARY_PATH = Path(__file__).with_name("scaffolds.json")
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+# In these files placeholders sit inside double-quoted string literals
+_STRING_LITERAL_SUFFIXES = {".py", ".js", ".jsx", ".ts", ".tsx", ".json"}
+_MARKUP_SUFFIXES = {".html", ".htm", ".xml", ".svg"}
+
+
+def blob_id(content: str) -> str:
+    """Content address of a file body."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def project_slug(project_name: str) -> str:
+    return _SLUG_RE.sub("-", project_name.lower()).strip("-") or "project"
+
+
+def _escape(path: str, value: str) -> str:
+    """Escape a placeholder value for the file it is substituted into."""
+    path = PurePosixPath(path)
+    if path.suffix in _STRING_LITERAL_SUFFIXES or path.name.startswith(".env"):
+        return json.dumps(value, ensure_ascii=False)[1:-1]
+    if path.suffix in _MARKUP_SUFFIXES:
+        return html.escape(value)
+    return value
+
+
+class Scaffold(NamedTuple):
+    name: str
+    title: str
+    # keyword or phrase -> weight; negative weights rule the scaffold out for e.g. "react native"
+    keywords: dict
+    # file path -> blob id
+    files: dict
+
+
+class ScaffoldLibrary:
+    """
+    Scaffolds live in one JSON file: a table of content-addressed blobs and a
+    manifest per scaffold mapping file paths to blob ids. Files shared by
+    several scaffolds (.gitignore, common configs) are stored once.
+
+    Rendering substitutes {{project_name}}, {{project_slug}} and {{description}};
+    any other braces (Jinja, JSX) are left alone. In code and .env files the
+    placeholders must sit inside double-quoted strings, since values are
+    escaped as string literal contents there; markup gets HTML escaping.
+    """
+
+    def __init__(self, path: Path = LIBRARY_PATH):
+        self.path = Path(path)
+        self._blobs = None
+        self._scaffolds = None
+        self._words = None
+        self._phrases = None
+
+    def _load(self) -> None:
+        if self._scaffolds is not None:
+            return
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        else:
+            data = {"blobs": {}, "scaffolds": {}}
+        self._blobs = data["blobs"]
+        self._scaffolds = {
+            name: Scaffold(name, entry["title"], entry["keywords"], entry["files"])
+            for name, entry in data["scaffolds"].items()
+        }
+        self._build_index()
+
+    def _build_index(self) -> None:
+        # Single words are looked up in the description's token set; phrases are substring checks
+        self._words = {}
+        self._phrases = []
+        for scaffold in self._scaffolds.values():
+            for keyword, weight in scaffold.keywords.items():
+                if " " in keyword:
+                    self._phrases.append((keyword, scaffold.name, weight))
+                else:
+                    self._words.setdefault(keyword, []).append((scaffold.name, weight))
+
+    @property
+    def scaffolds(self) -> dict:
+        self._load()
+        return self._scaffolds
+
+    def get(self, name: str):
+        return self.scaffolds.get(name)
+
+    def blob(self, blob: str) -> str:
+        self._load()
+        return self._blobs[blob]
+
+    def render(self, name: str, project_name: str, description: str) -> dict:
+        """Return {path: content} for a scaffold with placeholders filled in."""
+        scaffold = self.scaffolds[name]
+        values = {
+            "{{project_name}}": project_name,
+            "{{project_slug}}": project_slug(project_name),
+            "{{description}}": description,
+        }
+        files = {}
+        for path, blob in scaffold.files.items():
+            content = self._blobs[blob]
+            for placeholder, value in values.items():
+                content = content.replace(placeholder, _escape(path, value))
+            files[path] = content
+        return files
+
+    def scores(self, text: str) -> dict:
+        """Keyword score of every scaffold for free text."""
+        self._load()
+        text = text.lower()
+        scores = dict.fromkeys(self._scaffolds, 0)
+        for word in set(_WORD_RE.findall(text)):
+            for name, weight in self._words.get(word.rstrip(".-"), ()):
+                scores[name] += weight
+        for phrase, name, weight in self._phrases:
+            if phrase in text:
+                scores[name] += weight
+        return scores
+
+    def classify(self, project_name: str, description: str, min_score: int = 3):
+        """
+        Pick the scaffold matching a project, or None when no scaffold scores
+        at least `min_score` or the top two are tied.
+        """
+        scores = self.scores(f"{project_name} {description}")
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < min_score:
+            return None
+        if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+            return None
+        return self._scaffolds[ranked[0][0]]
+
+    # -- editing (used by tools.scaffolds) ---------------------------------
+
+    def add(self, name: str, title: str, keywords: dict, files: dict) -> Scaffold:
+        """Add or replace a scaffold from {path: content}."""
+        self._load()
+        manifest = {}
+        for path, content in sorted(files.items()):
+            blob = blob_id(content)
+            self._blobs[blob] = content
+            manifest[path] = blob
+        scaffold = Scaffold(name, title, keywords, manifest)
+        self._scaffolds[name] = scaffold
+        self._build_index()
+        return scaffold
+
+    def remove(self, name: str) -> None:
+        self._load()
+        del self._scaffolds[name]
+        self._build_index()
+
+    def save(self) -> None:
+        """Write the library, dropping blobs no scaffold references any more."""
+        self._load()
+        used = {blob for scaffold in self._scaffolds.values() for blob in scaffold.files.values()}
+        data = {
+            "blobs": {blob: self._blobs[blob] for blob in sorted(used)},
+            "scaffolds": {
+                name: {"title": s.title, "keywords": s.keywords, "files": s.files}
+                for name, s in sorted(self._scaffolds.items())
+            },
+        }
+        self.path.write_text(json.dumps(data, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+library = ScaffoldLibrary()
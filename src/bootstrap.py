@@ -0,0 +1,23 @@
+# Bootstrap - One-time application startup: configuration, storage, schema and exporters
+import config
+from config import METRICS_PORT, METRICS_ADDR
+from database.models import get_engine
+from database.migrations import migrate
+from utils import metrics
+
+
+def bootstrap() -> None:
+    """
+    Perform all startup side effects explicitly, once, before the first update.
+    Importing handlers or services does none of this, so tools and benchmarks
+    can import them cheaply.
+    """
+    config.validate()
+    config.ensure_directories()
+    
+    version = migrate(get_engine())
+    print(f"Database schema at version {version}")
+    
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT, METRICS_ADDR)
+        print(f"Serving metrics on http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
@@ -19,13 +19,106 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///project_bot.db')
 # Storage
 PROJECTS_STORAGE_DIR = os.getenv('PROJECTS_STORAGE_DIR', './projects_storage')
 
-# Validate required configurations
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-if not ADMIN_IDS:
-    raise ValueError("ADMIN_IDS not found in environment variables")
-
-# Create storage directory if not exists
-os.makedirs(PROJECTS_STORAGE_DIR, exist_ok=True)
+# Metrics - set METRICS_PORT to serve Prometheus metrics on http://METRICS_ADDR:METRICS_PORT/metrics
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_ADDR = os.getenv('METRICS_ADDR', '127.0.0.1')
+# Worker process n (from 0) serves its own metrics on WORKER_METRICS_PORT + n; 0 disables
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '0'))
+
+# Tracing - updates slower than this are logged with their span tree
+SLOW_UPDATE_THRESHOLD_MS = float(os.getenv('SLOW_UPDATE_THRESHOLD_MS', '2000'))
+
+# Profiling - admin-toggleable; keeps cProfile dumps of the PROFILE_KEEP slowest sampled updates
+PROFILE_DUMP_DIR = os.getenv('PROFILE_DUMP_DIR', './profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '10'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '1.0'))
+
+# Caches - per-process user status and feature-flag caches used by the update gate
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))
+SETTINGS_CACHE_TTL = float(os.getenv('SETTINGS_CACHE_TTL', '30'))
+PROJECT_LIST_CACHE_TTL = float(os.getenv('PROJECT_LIST_CACHE_TTL', '600'))
+
+# "My Projects" page size; admins can override it with the projects_page_size setting
+PROJECTS_PAGE_SIZE = int(os.getenv('PROJECTS_PAGE_SIZE', '10'))
+
+# Search - also index generated file paths and contents (larger index, slower project creation)
+SEARCH_INDEX_FILES = os.getenv('SEARCH_INDEX_FILES', 'false').lower() == 'true'
+SEARCH_MAX_FILE_BYTES = int(os.getenv('SEARCH_MAX_FILE_BYTES', '65536'))
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '8'))
+# Only the newest N matches of a query are ranked by relevance
+SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', '2000'))
+
+# Premium users get a larger share of generation capacity than ordinary users
+PREMIUM_USER_IDS = [int(user_id) for user_id in os.getenv('PREMIUM_USER_IDS', '').split(',') if user_id.strip()]
+
+# Generation scheduler - concurrent generations, per-user queue limit and fair-share weights
+GENERATION_SLOTS = int(os.getenv('GENERATION_SLOTS', '2'))
+GENERATION_MAX_QUEUED_PER_USER = int(os.getenv('GENERATION_MAX_QUEUED_PER_USER', '3'))
+ADMIN_PRIORITY_WEIGHT = int(os.getenv('ADMIN_PRIORITY_WEIGHT', '4'))
+PREMIUM_PRIORITY_WEIGHT = int(os.getenv('PREMIUM_PRIORITY_WEIGHT', '2'))
+# Initial guess of one generation's duration for wait estimates; refined as jobs finish
+GENERATION_ESTIMATE_SECONDS = float(os.getenv('GENERATION_ESTIMATE_SECONDS', '60'))
+
+# Workers - 'inline' runs generation and archive jobs in the bot process; 'queue' hands them to
+# worker processes (python -m workers.worker) through the jobs table
+WORKER_MODE = os.getenv('WORKER_MODE', 'inline')
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', str(os.cpu_count() or 2)))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '15'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+# Seconds the bot waits for a worker to take up a job before failing it (a job a live worker holds is awaited)
+JOB_WAIT_TIMEOUT = float(os.getenv('JOB_WAIT_TIMEOUT', '600'))
+# Seconds between storage GC runs scheduled by the worker supervisor
+STORAGE_GC_INTERVAL = float(os.getenv('STORAGE_GC_INTERVAL', '3600'))
+
+# Admin data tools - age of the projects removed by the "purge old projects" action
+PURGE_AGE_DAYS = int(os.getenv('PURGE_AGE_DAYS', '180'))
+
+# Broadcasts - Telegram allows a bot about 30 messages per second overall and one per second per
+# chat; broadcasts stay below that so replies to users still go out while one is running
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '20'))
+BROADCAST_PER_CHAT_INTERVAL = float(os.getenv('BROADCAST_PER_CHAT_INTERVAL', '1.0'))
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '8'))
+BROADCAST_BATCH_SIZE = int(os.getenv('BROADCAST_BATCH_SIZE', '200'))
+BROADCAST_MAX_ATTEMPTS = int(os.getenv('BROADCAST_MAX_ATTEMPTS', '3'))
+
+# Scaffolds - start common stacks from a stored skeleton and only generate the project-specific files
+SCAFFOLDS_ENABLED = os.getenv('SCAFFOLDS_ENABLED', 'true').lower() == 'true'
+SCAFFOLD_MIN_SCORE = int(os.getenv('SCAFFOLD_MIN_SCORE', '3'))
+
+# Callback buttons - payloads are signed with CALLBACK_SECRET (defaults to a key derived from the bot token)
+CALLBACK_SECRET = os.getenv('CALLBACK_SECRET')
+CALLBACK_MAX_AGE_HOURS = int(os.getenv('CALLBACK_MAX_AGE_HOURS', str(24 * 30)))
+
+# Update intake - 'polling' (default) or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+
+# Webhook mode - local server receiving updates; WEBHOOK_URL is the public base URL registered with Telegram
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '8'))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '200'))
+
+def validate() -> None:
+    """Validate required configurations. Called once by the application bootstrap."""
+    if not TELEGRAM_BOT_TOKEN:
+        raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+    if not ADMIN_IDS:
+        raise ValueError("ADMIN_IDS not found in environment variables")
+    if BOT_MODE not in ('polling', 'webhook'):
+        raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+    if WORKER_MODE not in ('inline', 'queue'):
+        raise ValueError("WORKER_MODE must be 'inline' or 'queue'")
+    if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+        raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+
+def ensure_directories() -> None:
+    """Create storage directories if not exists."""
+    os.makedirs(PROJECTS_STORAGE_DIR, exist_ok=True)
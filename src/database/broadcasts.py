@@ -0,0 +1,143 @@
+# Broadcasts - Admin broadcasts and their per-recipient delivery state
+import json
+from datetime import datetime
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from database.models import User, Broadcast, BroadcastDelivery
+
+# Broadcast status
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+# Delivery status
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+class BroadcastService:
+    """
+    Recipients are added to a broadcast as pending deliveries one batch of
+    users at a time, in users.id order, and each delivery is marked with its
+    outcome once sent. A restarted sender therefore continues with the
+    pending deliveries of the current batch and then with the users after
+    last_user_id; nothing already delivered is sent again.
+    """
+
+    @staticmethod
+    def count_recipients(db: Session) -> int:
+        """Users a broadcast started now would reach: everyone not banned."""
+        return db.query(func.count(User.id)).filter(User.is_banned.isnot(True)).scalar()
+
+    @staticmethod
+    def create(db: Session, text: str, entities: list, created_by: int) -> Broadcast:
+        broadcast = Broadcast(
+            text=text,
+            entities=json.dumps(entities) if entities else None,
+            created_by=created_by,
+            total=BroadcastService.count_recipients(db),
+        )
+        db.add(broadcast)
+        db.commit()
+        db.refresh(broadcast)
+        return broadcast
+
+    @staticmethod
+    def get(db: Session, broadcast_id: int):
+        return db.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+
+    @staticmethod
+    def recent(db: Session, limit: int = 5) -> list:
+        return db.query(Broadcast).order_by(Broadcast.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def running_ids(db: Session) -> list:
+        return [row.id for row in db.query(Broadcast.id).filter(Broadcast.status == RUNNING).order_by(Broadcast.id)]
+
+    @staticmethod
+    def next_recipients(db: Session, broadcast_id: int, limit: int) -> list:
+        """
+        Return up to `limit` pending (delivery id, chat id, attempts) of a running
+        broadcast, adding the next batch of users first if none are pending.
+        Returns [] once every user has been handled or the broadcast was stopped.
+        """
+        for _ in range(2):
+            broadcast = BroadcastService.get(db, broadcast_id)
+            if broadcast is None or broadcast.status != RUNNING:
+                return []
+            rows = (
+                db.query(BroadcastDelivery.id, BroadcastDelivery.chat_id, BroadcastDelivery.attempts)
+                .filter(BroadcastDelivery.broadcast_id == broadcast_id, BroadcastDelivery.status == PENDING)
+                .order_by(BroadcastDelivery.id).limit(limit).all()
+            )
+            if rows or not BroadcastService._add_recipients(db, broadcast, limit):
+                return [tuple(row) for row in rows]
+        return []
+
+    @staticmethod
+    def _add_recipients(db: Session, broadcast: Broadcast, limit: int) -> int:
+        users = (
+            db.query(User.id, User.telegram_id)
+            .filter(User.id > broadcast.last_user_id, User.is_banned.isnot(True))
+            .order_by(User.id).limit(limit).all()
+        )
+        if users:
+            db.bulk_insert_mappings(BroadcastDelivery, [
+                {"broadcast_id": broadcast.id, "user_id": user_id, "chat_id": chat_id, "status": PENDING}
+                for user_id, chat_id in users
+            ])
+            # Same transaction as the inserts, so a batch is never added twice
+            broadcast.last_user_id = users[-1][0]
+        db.commit()
+        return len(users)
+
+    @staticmethod
+    def record(db: Session, broadcast_id: int, outcomes: list) -> None:
+        """
+        Store (delivery id, status, attempts, error) outcomes and add the
+        finished ones to the broadcast's counters, in one transaction.
+        """
+        counts = {DELIVERED: 0, FAILED: 0, BLOCKED: 0}
+        now = datetime.utcnow()
+        for delivery_id, status, attempts, error in outcomes:
+            updated = db.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.id == delivery_id, BroadcastDelivery.status == PENDING)
+                .values(status=status, attempts=attempts, error=error, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if updated and status in counts:
+                counts[status] += 1
+        db.execute(
+            update(Broadcast).where(Broadcast.id == broadcast_id).values(
+                delivered=Broadcast.delivered + counts[DELIVERED],
+                failed=Broadcast.failed + counts[FAILED],
+                blocked=Broadcast.blocked + counts[BLOCKED],
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def finish(db: Session, broadcast_id: int) -> None:
+        """Mark a running broadcast done; its total becomes the number of recipients handled."""
+        db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status == RUNNING)
+            .values(status=DONE, finished_at=datetime.utcnow(),
+                    total=Broadcast.delivered + Broadcast.failed + Broadcast.blocked)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def cancel(db: Session, broadcast_id: int) -> bool:
+        cancelled = db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status == RUNNING)
+            .values(status=CANCELLED, finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(cancelled)
@@ -1,7 +1,13 @@
 # Database Operations - CRUD operations for database models
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 from database.models import User, Project, AdminSettings
-from datetime import datetime
+from database.search import SearchService
+from utils.cache import user_cache, settings_cache, project_list_cache, CachedUser
+from datetime import datetime, timedelta
+
+_MISSING = object()
+_EPOCH = datetime(1970, 1, 1)
 
 class UserService:
     @staticmethod
@@ -17,12 +23,25 @@ class UserService:
             db.add(user)
             db.commit()
             db.refresh(user)
+        user_cache.set(telegram_id, CachedUser(user.id, bool(user.is_banned)))
         return user
     
     @staticmethod
     def get_user_by_telegram_id(db: Session, telegram_id: int):
         return db.query(User).filter(User.telegram_id == telegram_id).first()
     
+    @staticmethod
+    def get_user_status(db: Session, telegram_id: int):
+        """Return the cached CachedUser(user_id, is_banned) for a Telegram user, or None if unknown."""
+        status = user_cache.get(telegram_id)
+        if status is None:
+            user = UserService.get_user_by_telegram_id(db, telegram_id)
+            if not user:
+                return None
+            status = CachedUser(user.id, bool(user.is_banned))
+            user_cache.set(telegram_id, status)
+        return status
+    
     @staticmethod
     def get_all_users(db: Session):
         return db.query(User).all()
@@ -33,6 +52,7 @@ class UserService:
         if user:
             user.is_banned = True
             db.commit()
+            user_cache.invalidate(telegram_id)
             return True
         return False
     
@@ -42,12 +62,19 @@ class UserService:
         if user:
             user.is_banned = False
             db.commit()
+            user_cache.invalidate(telegram_id)
             return True
         return False
 
 class ProjectService:
     @staticmethod
-    def create_project(db: Session, user_id: int, name: str, description: str, file_path: str):
+    def create_project(db: Session, user_id: int, name: str, description: str, file_path: str = None,
+                       files: dict = None, place_files=None):
+        """
+        Insert a project. place_files(project_id) -> file_path, if given, is called
+        once the id is known and before the commit, so the files can be moved to
+        an id-keyed location in the same step that makes the project visible.
+        """
         project = Project(
             user_id=user_id,
             name=name,
@@ -55,14 +82,70 @@ class ProjectService:
             file_path=file_path
         )
         db.add(project)
+        db.flush()
+        if place_files is not None:
+            try:
+                project.file_path = place_files(project.id)
+            except Exception:
+                db.rollback()
+                raise
+        SearchService.index_project(db, project, files)
         db.commit()
         db.refresh(project)
+        project_list_cache.invalidate(user_id)
         return project
     
     @staticmethod
     def get_user_projects(db: Session, user_id: int):
         return db.query(Project).filter(Project.user_id == user_id).order_by(Project.created_at.desc()).all()
     
+    @staticmethod
+    def get_user_project_paths(db: Session, user_id: int) -> list:
+        """File and archive paths of all of a user's projects."""
+        paths = []
+        for file_path, zip_path in db.query(Project.file_path, Project.zip_path).filter(Project.user_id == user_id):
+            paths += [file_path, zip_path]
+        return paths
+    
+    @staticmethod
+    def get_user_projects_page(db: Session, user_id: int, limit: int, cursor: tuple = None, backward: bool = False):
+        """
+        Keyset pagination over a user's projects, newest first, on (created_at, id).
+        cursor is the (created_at, id) of the last row of the previous page, or of
+        the first row of the next page when paging backward.
+        Returns (projects, has_more) where has_more refers to the paging direction.
+        """
+        query = db.query(Project).filter(Project.user_id == user_id)
+        key = tuple_(Project.created_at, Project.id)
+        if backward:
+            if cursor:
+                query = query.filter(key > tuple_(*cursor))
+            query = query.order_by(Project.created_at.asc(), Project.id.asc())
+        else:
+            if cursor:
+                query = query.filter(key < tuple_(*cursor))
+            query = query.order_by(Project.created_at.desc(), Project.id.desc())
+        
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+        return rows, has_more
+    
+    @staticmethod
+    def count_user_projects(db: Session, user_id: int) -> int:
+        return db.query(func.count(Project.id)).filter(Project.user_id == user_id).scalar()
+    
+    @staticmethod
+    def page_cursor(project: Project) -> tuple:
+        """Integer form (microseconds since epoch, id) of a project's page position."""
+        return (project.created_at - _EPOCH) // timedelta(microseconds=1), project.id
+    
+    @staticmethod
+    def parse_page_cursor(micros: int, project_id: int) -> tuple:
+        return _EPOCH + timedelta(microseconds=micros), project_id
+    
     @staticmethod
     def get_project(db: Session, project_id: int):
         return db.query(Project).filter(Project.id == project_id).first()
@@ -75,8 +158,23 @@ class ProjectService:
             project.updated_at = datetime.utcnow()
             db.commit()
             db.refresh(project)
+            project_list_cache.invalidate(project.user_id)
         return project
     
+    @staticmethod
+    def move_project_files(db: Session, project_id: int, old_paths: tuple, new_paths: tuple) -> bool:
+        """
+        Point a project at relocated (file_path, zip_path), unless either path
+        changed since old_paths were read. Returns whether the row was updated.
+        """
+        moved = db.query(Project).filter(
+            Project.id == project_id,
+            Project.file_path == old_paths[0],
+            Project.zip_path.is_(None) if old_paths[1] is None else Project.zip_path == old_paths[1],
+        ).update({"file_path": new_paths[0], "zip_path": new_paths[1]}, synchronize_session=False)
+        db.commit()
+        return bool(moved)
+    
     @staticmethod
     def get_all_projects(db: Session):
         return db.query(Project).all()
@@ -86,15 +184,36 @@ class ProjectService:
         project = db.query(Project).filter(Project.id == project_id).first()
         if project:
             db.delete(project)
+            SearchService.remove_project(db, project_id)
             db.commit()
+            project_list_cache.invalidate(project.user_id)
             return True
         return False
 
+    @staticmethod
+    def delete_projects(db: Session, projects: list) -> None:
+        """
+        Delete a batch of (id, user_id) project rows and their search entries
+        in one transaction. Files are left to the caller.
+        """
+        if not projects:
+            return
+        project_ids = [project_id for project_id, _ in projects]
+        db.query(Project).filter(Project.id.in_(project_ids)).delete(synchronize_session=False)
+        SearchService.remove_projects(db, project_ids)
+        db.commit()
+        for user_id in {user_id for _, user_id in projects}:
+            project_list_cache.invalidate(user_id)
+
 class SettingsService:
     @staticmethod
     def get_setting(db: Session, key: str):
-        setting = db.query(AdminSettings).filter(AdminSettings.key == key).first()
-        return setting.value if setting else None
+        value = settings_cache.get(key, _MISSING)
+        if value is _MISSING:
+            setting = db.query(AdminSettings).filter(AdminSettings.key == key).first()
+            value = setting.value if setting else None
+            settings_cache.set(key, value)
+        return value
     
     @staticmethod
     def set_setting(db: Session, key: str, value: str):
@@ -105,8 +224,20 @@ class SettingsService:
             setting = AdminSettings(key=key, value=value)
             db.add(setting)
         db.commit()
+        settings_cache.invalidate(key)
         return setting
     
+    @staticmethod
+    def is_enabled(db: Session, key: str) -> bool:
+        """Feature flags are stored as 'true'/'false' and default to enabled."""
+        return SettingsService.get_setting(db, key) != "false"
+    
+    @staticmethod
+    def toggle_setting(db: Session, key: str) -> bool:
+        enabled = not SettingsService.is_enabled(db, key)
+        SettingsService.set_setting(db, key, "true" if enabled else "false")
+        return enabled
+    
     @staticmethod
     def get_all_settings(db: Session):
         return db.query(AdminSettings).all()
@@ -0,0 +1,75 @@
+# Data Exports - Stream users and projects to CSV or JSON Lines files
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database.models import User, Project
+
+FORMATS = ("csv", "jsonl")
+# Rows fetched from the cursor and written per step
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _users_query():
+    project_count = (
+        select(func.count(Project.id)).where(Project.user_id == User.id)
+        .correlate(User).scalar_subquery()
+    )
+    return select(
+        User.id, User.telegram_id, User.username, User.first_name, User.last_name,
+        User.is_banned, User.created_at, project_count.label("projects"),
+    ).order_by(User.id)
+
+
+def _projects_query():
+    return select(
+        Project.id, Project.user_id, User.telegram_id.label("owner_telegram_id"),
+        Project.name, Project.description, Project.created_at, Project.updated_at,
+        Project.zip_path.isnot(None).label("has_archive"),
+    ).outerjoin(User, Project.user_id == User.id).order_by(Project.id)
+
+
+# entity -> (rows query, row count query)
+EXPORTS = {
+    "users": (_users_query, lambda: select(func.count(User.id))),
+    "projects": (_projects_query, lambda: select(func.count(Project.id))),
+}
+
+
+def _plain(row) -> dict:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def iter_export_chunks(db: Session, entity: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield the rows of an export as lists of dicts, chunk_size at a time, from
+    a server-side cursor so the whole table is never held in memory.
+    """
+    result = db.execute(
+        EXPORTS[entity][0](),
+        execution_options={"stream_results": True, "yield_per": chunk_size},
+    )
+    for partition in result.mappings().partitions():
+        yield [_plain(row) for row in partition]
+
+
+def write_export(db: Session, entity: str, fmt: str, path: str, progress=None) -> int:
+    """Write an export to path and return the number of rows. progress gets {"rows", "total"}."""
+    query, count_query = EXPORTS[entity]
+    total = db.execute(count_query()).scalar()
+    columns = list(query().selected_columns.keys())
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+        for chunk in iter_export_chunks(db, entity):
+            if fmt == "csv":
+                writer.writerows(chunk)
+            else:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+            rows += len(chunk)
+            if progress:
+                progress({"rows": rows, "total": total})
+    return rows
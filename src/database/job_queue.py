@@ -0,0 +1,165 @@
+# Job Queue - Database-backed job queue with leases, shared by the bot and worker processes
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update, func
+from sqlalchemy.orm import Session
+from database.models import Job
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _claimable(now: datetime):
+    return or_(
+        Job.status == QUEUED,
+        and_(Job.status == RUNNING, Job.lease_expires_at < now, Job.attempts < Job.max_attempts),
+    )
+
+
+class JobQueue:
+    """
+    Workers claim a job by taking a lease on it and keep the lease alive with
+    heartbeats. If a worker dies its lease runs out and the job becomes
+    claimable again, up to max_attempts attempts in total.
+
+    Claiming is an optimistic compare-and-set UPDATE, so any number of worker
+    processes can poll the same table without further locking.
+    """
+
+    @staticmethod
+    def enqueue(db: Session, kind: str, payload: dict, max_attempts: int = 3) -> Job:
+        job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max_attempts)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get(db: Session, job_id: int):
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    @staticmethod
+    def claim(db: Session, worker_id: str, lease_seconds: float, kinds: list = None):
+        """Lease the oldest claimable job to `worker_id`. Returns the Job or None."""
+        for _ in range(5):
+            now = datetime.utcnow()
+            query = db.query(Job.id).filter(_claimable(now))
+            if kinds:
+                query = query.filter(Job.kind.in_(kinds))
+            row = query.order_by(Job.id).first()
+            if row is None:
+                return None
+
+            # Another worker may take the same row between the SELECT and this UPDATE;
+            # the WHERE repeats the claim condition so only one of them wins
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == row.id, _claimable(now))
+                .values(
+                    status=RUNNING,
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    heartbeat_at=now,
+                    attempts=Job.attempts + 1,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return JobQueue.get(db, row.id)
+        return None
+
+    @staticmethod
+    def heartbeat(db: Session, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease. False means the lease was lost and the job must be abandoned."""
+        now = datetime.utcnow()
+        extended = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == RUNNING, Job.lease_owner == worker_id)
+            .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(extended)
+
+    @staticmethod
+    def set_progress(db: Session, job_id: int, worker_id: str, progress: dict) -> None:
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == RUNNING, Job.lease_owner == worker_id)
+            .values(progress=json.dumps(progress))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def complete(db: Session, job_id: int, worker_id: str, result: dict) -> bool:
+        return JobQueue._finish(db, job_id, worker_id, status=DONE, result=json.dumps(result))
+
+    @staticmethod
+    def fail(db: Session, job_id: int, worker_id: str, error: str, retry: bool = False) -> bool:
+        """Record a failure; with retry the job is queued again while attempts remain."""
+        job = JobQueue.get(db, job_id)
+        status = QUEUED if retry and job is not None and job.attempts < job.max_attempts else FAILED
+        return JobQueue._finish(db, job_id, worker_id, status=status, error=error)
+
+    @staticmethod
+    def _finish(db: Session, job_id: int, worker_id: str, **values) -> bool:
+        finished = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == RUNNING, Job.lease_owner == worker_id)
+            .values(lease_owner=None, lease_expires_at=None, updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(finished)
+
+    @staticmethod
+    def abandon(db: Session, job_id: int, error: str) -> bool:
+        """
+        Fail a job nobody is working on: still queued, or running under an expired
+        lease. Returns False if a live worker holds it (or it already finished).
+        """
+        now = datetime.utcnow()
+        abandoned = db.execute(
+            update(Job)
+            .where(Job.id == job_id, or_(
+                Job.status == QUEUED,
+                and_(Job.status == RUNNING, Job.lease_expires_at < now),
+            ))
+            .values(status=FAILED, error=error, lease_owner=None, lease_expires_at=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(abandoned)
+
+    @staticmethod
+    def recover_expired(db: Session) -> int:
+        """Fail running jobs whose lease expired with no attempts left. Returns how many."""
+        now = datetime.utcnow()
+        failed = db.execute(
+            update(Job)
+            .where(Job.status == RUNNING, Job.lease_expires_at < now, Job.attempts >= Job.max_attempts)
+            .values(status=FAILED, error="lease expired", lease_owner=None, lease_expires_at=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return failed
+
+    @staticmethod
+    def purge_finished(db: Session, older_than: timedelta) -> int:
+        """Delete done and failed jobs last updated before `older_than` ago."""
+        deleted = db.query(Job).filter(
+            Job.status.in_((DONE, FAILED)),
+            Job.updated_at < datetime.utcnow() - older_than,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def counts(db: Session) -> dict:
+        """Number of jobs per status."""
+        return dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
@@ -0,0 +1,117 @@
+# Database Migrations - Versioned schema changes applied by the application bootstrap
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from database.models import User, Project, AdminSettings, Job, Broadcast, BroadcastDelivery
+from database.search import create_search_index
+from utils.storage import StorageManager
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+def _initial_schema(conn) -> None:
+    # checkfirst adopts databases created by the old create_all() at import time
+    for model in (User, Project, AdminSettings):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+
+def _project_page_index(conn) -> None:
+    for index in Project.__table__.indexes:
+        if index.name == "ix_projects_user_created_id":
+            index.create(bind=conn, checkfirst=True)
+
+
+def _job_queue(conn) -> None:
+    Job.__table__.create(bind=conn, checkfirst=True)
+
+
+def _job_progress(conn) -> None:
+    # New databases already get the column from the model in migration 4
+    if "progress" not in {column["name"] for column in inspect(conn).get_columns("jobs")}:
+        conn.exec_driver_sql("ALTER TABLE jobs ADD COLUMN progress TEXT")
+
+
+def _broadcasts(conn) -> None:
+    for model in (Broadcast, BroadcastDelivery):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+
+def _project_autoincrement(conn) -> None:
+    # Without AUTOINCREMENT SQLite hands the id of the newest project out again once it is
+    # deleted, while its files may still be on disk; only SQLite needs the table rebuilt
+    if conn.dialect.name != "sqlite":
+        return
+    table_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'projects'").scalar()
+    if "AUTOINCREMENT" not in table_sql.upper():
+        columns = ", ".join(column["name"] for column in inspect(conn).get_columns("projects")
+                            if column["name"] in Project.__table__.columns)
+        conn.exec_driver_sql("ALTER TABLE projects RENAME TO projects_old")
+        for index in Project.__table__.indexes:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        Project.__table__.create(bind=conn)
+        conn.exec_driver_sql(f"INSERT INTO projects ({columns}) SELECT {columns} FROM projects_old")
+        conn.exec_driver_sql("DROP TABLE projects_old")
+    # Ids deleted before this migration may still name directories on disk; start above them
+    highest = max(conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM projects").scalar(),
+                  StorageManager.max_stored_project_id())
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'projects'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('projects', ?)", (highest,))
+
+
+# (version, name, upgrade(conn)) - append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "full-text search index", create_search_index),
+    (3, "project pagination index", _project_page_index),
+    (4, "job queue", _job_queue),
+    (5, "job progress", _job_progress),
+    (6, "broadcasts", _broadcasts),
+    (7, "monotonic project ids", _project_autoincrement),
+]
+
+
+def current_version(conn) -> int:
+    """Return the highest applied migration version (0 for a fresh database)."""
+    schema_migrations.create(bind=conn, checkfirst=True)
+    versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def _lock(conn) -> None:
+    # The bot and worker processes may start together. BEGIN IMMEDIATE takes SQLite's write
+    # lock before the version is read, so one process applies a step and the others find it
+    # applied once they get the lock
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def migrate(engine) -> int:
+    """Apply pending migrations in order, each in its own transaction. Returns the schema version."""
+    with engine.begin() as conn:
+        _lock(conn)
+        version = current_version(conn)
+
+    for target, name, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            _lock(conn)
+            version = current_version(conn)
+            if target <= version:
+                continue
+            upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=target, name=name, applied_at=datetime.utcnow()
+            ))
+        print(f"Applied migration {target}: {name}")
+        version = target
+
+    return version
@@ -1,12 +1,42 @@
 # Database Models - SQLAlchemy models for data persistence
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, Index, UniqueConstraint, Column, Integer, String, DateTime, Text, Boolean, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 from config import DATABASE_URL
+from utils import metrics, tracing
+
+_engine = None
+
+def get_engine():
+    """Create the database engine on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, echo=False)
+        event.listen(_engine, "before_cursor_execute", metrics.count_db_query)
+        event.listen(_engine, "before_cursor_execute", tracing.before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", tracing.after_cursor_execute)
+        event.listen(_engine, "handle_error", tracing.handle_error)
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine, "connect", _sqlite_pragmas)
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the bot read while worker processes write; wait for locks instead of failing
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=10000")
+    cursor.close()
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+def SessionLocal():
+    """Open a new session, creating the engine lazily on the first call."""
+    if _engine is None:
+        get_engine()
+    return _session_factory()
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class User(Base):
@@ -35,6 +65,13 @@ class Project(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     owner = relationship("User", back_populates="projects")
+    
+    # Keyset pagination of a user's projects on (created_at, id); AUTOINCREMENT because project
+    # files are stored under the id, which therefore must never be handed out twice
+    __table_args__ = (
+        Index("ix_projects_user_created_id", "user_id", "created_at", "id"),
+        {"sqlite_autoincrement": True},
+    )
 
 class AdminSettings(Base):
     __tablename__ = "admin_settings"
@@ -44,8 +81,66 @@ class AdminSettings(Base):
     value = Column(String)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    # queued -> running -> done | failed; a running job whose lease expired is claimable again
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    # Latest progress report of a running job, as JSON
+    progress = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Claiming scans for the oldest claimable job by status
+    __table_args__ = (Index("ix_jobs_status_id", "status", "id"),)
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(Text, nullable=False)
+    # Formatting of the admin's message as a JSON list of Telegram MessageEntity dicts
+    entities = Column(Text, nullable=True)
+    created_by = Column(Integer, nullable=False)
+    # running -> done | cancelled
+    status = Column(String, nullable=False, default="running")
+    # Recipients are added in batches by users.id; the highest id added so far
+    last_user_id = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    delivered = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class BroadcastDelivery(Base):
+    __tablename__ = "broadcast_deliveries"
+    
+    id = Column(Integer, primary_key=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id"), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    chat_id = Column(Integer, nullable=False)
+    # pending -> delivered | failed | blocked
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # The sender walks a broadcast's pending deliveries in id order
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "user_id", name="uq_broadcast_deliveries_recipient"),
+        Index("ix_broadcast_deliveries_status_id", "broadcast_id", "status", "id"),
+    )
 
 def get_db():
     db = SessionLocal()
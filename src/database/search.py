@@ -0,0 +1,182 @@
+# Search - Full-text search over projects backed by SQLite FTS5
+import re
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from database.models import Project
+from config import SEARCH_INDEX_FILES, SEARCH_MAX_FILE_BYTES, SEARCH_RANK_WINDOW
+
+# Owner column holds a single "u<user_id>" token so per-user searches are an
+# index intersection instead of a filter over every match
+PROJECTS_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5("
+    "owner, name, description, tokenize='unicode61 remove_diacritics 2')"
+)
+FILES_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS project_files_fts USING fts5("
+    "owner, path, content, project_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+)
+
+# bm25 column weights: owner, name, description
+_PROJECT_WEIGHTS = "0.0, 10.0, 1.0"
+# owner, path, content
+_FILE_WEIGHTS = "0.0, 4.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available(conn) -> bool:
+    """True if the connection is SQLite with the FTS5 extension compiled in."""
+    if conn.dialect.name != "sqlite":
+        return False
+    options = [row[0] for row in conn.exec_driver_sql("PRAGMA compile_options").fetchall()]
+    return "ENABLE_FTS5" in options
+
+
+def create_search_index(conn) -> None:
+    """Migration step: create the FTS tables and index existing projects."""
+    if not fts5_available(conn):
+        print("FTS5 not available; project search falls back to LIKE queries")
+        return
+    conn.exec_driver_sql(PROJECTS_FTS_SQL)
+    conn.exec_driver_sql(FILES_FTS_SQL)
+    conn.exec_driver_sql(
+        "INSERT INTO projects_fts(rowid, owner, name, description) "
+        "SELECT id, 'u' || user_id, name, COALESCE(description, '') FROM projects"
+    )
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix so results show up while the user is still typing.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())[:8]
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchService:
+    _fts_enabled = None
+
+    @staticmethod
+    def is_enabled(db: Session) -> bool:
+        # Only a found index is cached: probed before migration 2 has run, a cached
+        # False would disable search for the life of the process
+        if not SearchService._fts_enabled:
+            conn = db.connection()
+            SearchService._fts_enabled = conn.dialect.name == "sqlite" and conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'projects_fts'"
+            ).first() is not None
+        return SearchService._fts_enabled
+
+    @staticmethod
+    def index_project(db: Session, project: Project, files: dict = None) -> None:
+        """Add or refresh a project in the index. Runs in the caller's transaction."""
+        if not SearchService.is_enabled(db):
+            return
+        SearchService.remove_project(db, project.id)
+        db.execute(
+            text("INSERT INTO projects_fts(rowid, owner, name, description) VALUES (:id, :owner, :name, :description)"),
+            {"id": project.id, "owner": f"u{project.user_id}", "name": project.name,
+             "description": project.description or ""},
+        )
+        if files and SEARCH_INDEX_FILES:
+            db.execute(
+                text("INSERT INTO project_files_fts(owner, path, content, project_id) "
+                     "VALUES (:owner, :path, :content, :project_id)"),
+                [
+                    {"owner": f"u{project.user_id}", "path": path,
+                     "content": content[:SEARCH_MAX_FILE_BYTES], "project_id": project.id}
+                    for path, content in files.items()
+                ],
+            )
+
+    @staticmethod
+    def remove_project(db: Session, project_id: int) -> None:
+        """Drop a project and its files from the index. Runs in the caller's transaction."""
+        if not SearchService.is_enabled(db):
+            return
+        db.execute(text("DELETE FROM projects_fts WHERE rowid = :id"), {"id": project_id})
+        if SEARCH_INDEX_FILES:
+            db.execute(text("DELETE FROM project_files_fts WHERE project_id = :id"), {"id": project_id})
+
+    @staticmethod
+    def remove_projects(db: Session, project_ids: list) -> None:
+        """remove_project for a batch of projects in one statement per table."""
+        if not project_ids or not SearchService.is_enabled(db):
+            return
+        ids = {"ids": list(project_ids)}
+        db.execute(text("DELETE FROM projects_fts WHERE rowid IN :ids").bindparams(
+            bindparam("ids", expanding=True)), ids)
+        if SEARCH_INDEX_FILES:
+            db.execute(text("DELETE FROM project_files_fts WHERE project_id IN :ids").bindparams(
+                bindparam("ids", expanding=True)), ids)
+
+    @staticmethod
+    def search_projects(db: Session, query: str, user_id: int = None, limit: int = 10, offset: int = 0):
+        """
+        Return up to `limit` projects matching `query`, best match first,
+        optionally restricted to one owner. Also returns whether more results exist.
+        """
+        match = build_match_query(query)
+        if not match:
+            return [], False
+
+        if not SearchService.is_enabled(db):
+            return SearchService._search_like(db, query, user_id, limit, offset)
+
+        # Restrict the terms to the searchable columns, or they would also match the owner token
+        project_match = f"{{name description}} : ({match})"
+        file_match = f"{{path content}} : ({match})"
+        if user_id is not None:
+            project_match = f'owner:"u{user_id}" AND {project_match}'
+            file_match = f'owner:"u{user_id}" AND {file_match}'
+        # Fetch one extra row to know whether there is a next page
+        window = offset + limit + 1
+        # bm25 is only computed for the newest SEARCH_RANK_WINDOW matches, which keeps
+        # very broad queries (one common word over millions of rows) in the ms range
+        ranked = db.execute(
+            text("SELECT rowid, score FROM ("
+                 f"SELECT rowid, bm25(projects_fts, {_PROJECT_WEIGHTS}) AS score FROM projects_fts "
+                 "WHERE projects_fts MATCH :match ORDER BY rowid DESC LIMIT :rank_window"
+                 ") ORDER BY score LIMIT :window"),
+            {"match": project_match, "rank_window": max(SEARCH_RANK_WINDOW, window), "window": window},
+        ).all()
+        scores = {project_id: score for project_id, score in ranked}
+
+        if SEARCH_INDEX_FILES:
+            file_hits = db.execute(
+                text("SELECT project_id, MIN(score) AS best FROM ("
+                     f"SELECT project_id, bm25(project_files_fts, {_FILE_WEIGHTS}) AS score "
+                     "FROM project_files_fts WHERE project_files_fts MATCH :match "
+                     "ORDER BY rowid DESC LIMIT :rank_window"
+                     ") GROUP BY project_id ORDER BY best LIMIT :window"),
+                {"match": file_match, "rank_window": max(SEARCH_RANK_WINDOW, window), "window": window},
+            ).all()
+            for project_id, score in file_hits:
+                # File hits rank below a comparable name/description hit
+                scores[project_id] = min(scores.get(project_id, 0.0), score / 2)
+
+        ordered = sorted(scores, key=lambda project_id: (scores[project_id], -project_id))
+        page_ids = ordered[offset:offset + limit]
+        has_more = len(ordered) > offset + limit
+        if not page_ids:
+            return [], False
+
+        projects = {p.id: p for p in db.query(Project).filter(Project.id.in_(page_ids)).all()}
+        return [projects[pid] for pid in page_ids if pid in projects], has_more
+
+    @staticmethod
+    def _search_like(db: Session, query: str, user_id: int, limit: int, offset: int):
+        """Fallback for databases without FTS5: substring match on every word, newest first."""
+        q = db.query(Project)
+        if user_id is not None:
+            q = q.filter(Project.user_id == user_id)
+        for token in _TOKEN_RE.findall(query)[:8]:
+            pattern = f"%{token}%"
+            q = q.filter(Project.name.ilike(pattern) | Project.description.ilike(pattern))
+        rows = q.order_by(Project.created_at.desc(), Project.id.desc()).offset(offset).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
@@ -1,53 +1,84 @@
+import contextvars
+import html
+import os
+import time
+from datetime import datetime
+from pathlib import Path
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ChatAction
-from src.database.crud import (
-    get_all_users, get_all_projects, get_user_projects,
-    get_user_by_id, delete_project, toggle_feature
-)
-from src.config import ADMIN_IDS
+from telegram.error import TelegramError
+from database.models import SessionLocal
+from database.crud import UserService, ProjectService, SettingsService
+from database.job_queue import JobQueue
+from database.broadcasts import BroadcastService, RUNNING
+from config import ADMIN_IDS, PROJECTS_PAGE_SIZE, WORKER_MODE, PURGE_AGE_DAYS
+from utils.cache import project_list_cache
+from utils.storage import StorageManager
+from utils import metrics, tracing
+from utils.metrics import instrument_handler
+from utils.broadcast import broadcast_engine
+from workers.client import run_job, JobFailed
+from workers.tasks import EXPORT, PURGE
 
 # Admin conversation states
-ADMIN_MENU, VIEW_USERS, VIEW_PROJECTS, MANAGE_SETTINGS = range(4)
+(ADMIN_MENU, VIEW_USERS, VIEW_PROJECTS, MANAGE_SETTINGS, VIEW_STATS, DATA_TOOLS,
+ BROADCAST, BROADCAST_COMPOSE) = range(8)
 
+PAGE_SIZE_CHOICES = (5, 10, 20)
+
+# Seconds between progress edits of a data tools status message
+PROGRESS_EDIT_INTERVAL = 3.0
+# Bot API upload limit for documents
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+@instrument_handler
 async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show admin menu"""
     user_id = update.effective_user.id
     
     if user_id not in ADMIN_IDS:
-        await update.message.reply_text("❌ You don't have admin access.")
+        await update.effective_message.reply_text("❌ You don't have admin access.")
         return ConversationHandler.END
     
     keyboard = [
         [InlineKeyboardButton("👥 View All Users", callback_data="admin_users")],
         [InlineKeyboardButton("📁 View All Projects", callback_data="admin_projects")],
         [InlineKeyboardButton("⚙️ Bot Settings", callback_data="admin_settings")],
+        [InlineKeyboardButton("📊 Stats", callback_data="admin_stats")],
+        [InlineKeyboardButton("🗄 Data Tools", callback_data="admin_data")],
+        [InlineKeyboardButton("📣 Broadcast", callback_data="admin_broadcast")],
         [InlineKeyboardButton("🔙 Back", callback_data="back_to_start")],
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        "🔐 <b>Admin Panel</b>\n\nSelect an option:",
-        reply_markup=reply_markup,
-        parse_mode="HTML"
-    )
+    text = "🔐 <b>Admin Panel</b>\n\nSelect an option:"
+    if update.callback_query:
+        await update.callback_query.answer()
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
+    else:
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML")
     return ADMIN_MENU
 
+@instrument_handler
 async def view_all_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Display all users"""
     query = update.callback_query
     await query.answer()
     
-    users = get_all_users()
+    db = SessionLocal()
+    users = UserService.get_all_users(db)
     
     if not users:
         await query.edit_message_text("📭 No users found.")
+        db.close()
         return VIEW_USERS
     
     message = "<b>👥 All Users:</b>\n\n"
     for user in users:
         message += f"• <b>{user.username}</b> (ID: <code>{user.telegram_id}</code>)\n"
         message += f"  Projects: {len(user.projects)}\n"
+    db.close()
     
     keyboard = [
         [InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")],
@@ -61,23 +92,26 @@ async def view_all_users(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
     return VIEW_USERS
 
+@instrument_handler
 async def view_all_projects(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Display all projects"""
     query = update.callback_query
     await query.answer()
     
-    projects = get_all_projects()
+    db = SessionLocal()
+    projects = ProjectService.get_all_projects(db)
     
     if not projects:
         await query.edit_message_text("📭 No projects found.")
+        db.close()
         return VIEW_PROJECTS
     
     message = "<b>📁 All Projects:</b>\n\n"
     for project in projects:
-        user = get_user_by_id(project.user_id)
         message += f"• <b>{project.name}</b>\n"
-        message += f"  Owner: {user.username}\n"
+        message += f"  Owner: {project.owner.username}\n"
         message += f"  Created: {project.created_at.strftime('%Y-%m-%d')}\n\n"
+    db.close()
     
     keyboard = [
         [InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")],
@@ -91,6 +125,77 @@ async def view_all_projects(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
     return VIEW_PROJECTS
 
+@instrument_handler
+async def view_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Display handler latency, generation and storage metrics"""
+    query = update.callback_query
+    await query.answer()
+    
+    def ms(seconds):
+        return f"{seconds * 1000:.0f}ms"
+    
+    message = "<b>📊 Stats</b>\n\n<b>Handlers</b> (count, avg, p50, p95, queries):\n"
+    queries = {row["labels"].get("handler"): row for row in metrics.summarize("db_queries_per_update")}
+    handler_rows = metrics.summarize("handler_seconds")
+    for row in handler_rows[:15]:
+        name = row["labels"].get("handler")
+        avg_queries = queries[name]["avg"] if name in queries else 0
+        message += (
+            f"• <code>{name}</code>: {row['count']}, {ms(row['avg'])}, "
+            f"{ms(row['p50'])}, {ms(row['p95'])}, {avg_queries:.1f}\n"
+        )
+    if not handler_rows:
+        message += "No updates handled yet.\n"
+    
+    message += "\n<b>Generation & Storage</b> (count, avg, p95):\n"
+    for name, label in (
+        ("gemini_seconds", "Gemini latency"),
+        ("storage_save_seconds", "Save files"),
+        ("storage_compress_seconds", "Compress"),
+    ):
+        for row in metrics.summarize(name):
+            mode = f" ({row['labels']['mode']})" if "mode" in row["labels"] else ""
+            message += f"• {label}{mode}: {row['count']}, {ms(row['avg'])}, {ms(row['p95'])}\n"
+    for name, label in (
+        ("gemini_output_tokens", "Output tokens"),
+        ("archive_bytes", "Archive bytes"),
+    ):
+        for row in metrics.summarize(name):
+            mode = f" ({row['labels']['mode']})" if "mode" in row["labels"] else ""
+            message += f"• {label}{mode}: {row['count']}, avg {row['avg']:.0f}, p95 ≤ {row['p95']:.0f}\n"
+    
+    errors = sum(
+        value for (name, _), value in metrics.snapshot()["counters"].items()
+        if name == "handler_errors_total"
+    )
+    message += f"\n❗ Handler errors: {errors:.0f}\n"
+    for (name, labels), value in sorted(metrics.snapshot()["gauges"].items()):
+        message += f"📈 {name}: {value}\n"
+    
+    if WORKER_MODE == "queue":
+        db = SessionLocal()
+        try:
+            counts = JobQueue.counts(db)
+        finally:
+            db.close()
+        message += "\n<b>Job queue</b>: " + (
+            ", ".join(f"{status} {count}" for status, count in sorted(counts.items())) or "empty"
+        ) + "\n"
+    
+    keyboard = [
+        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_stats")],
+        [InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")],
+    ]
+    
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(
+        message,
+        reply_markup=reply_markup,
+        parse_mode="HTML"
+    )
+    return VIEW_STATS
+
+@instrument_handler
 async def bot_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show bot settings"""
     query = update.callback_query
@@ -99,6 +204,8 @@ async def bot_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     keyboard = [
         [InlineKeyboardButton("🔄 Toggle Project Generation", callback_data="toggle_generation")],
         [InlineKeyboardButton("🔄 Toggle Project Viewing", callback_data="toggle_viewing")],
+        [InlineKeyboardButton("🧪 Toggle Profiler", callback_data="toggle_profiler")],
+        [InlineKeyboardButton("📄 Change Projects Page Size", callback_data="cycle_page_size")],
         [InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")],
     ]
     
@@ -110,27 +217,378 @@ async def bot_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     )
     return MANAGE_SETTINGS
 
+@instrument_handler
 async def toggle_generation_feature(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Toggle project generation feature"""
     query = update.callback_query
     await query.answer()
     
-    # Toggle the feature (this would be stored in database)
-    toggle_feature("project_generation")
+    db = SessionLocal()
+    SettingsService.toggle_setting(db, "project_generation")
+    db.close()
     await query.edit_message_text("✅ Project generation feature toggled!")
     
     return MANAGE_SETTINGS
 
+@instrument_handler
 async def toggle_viewing_feature(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Toggle project viewing feature"""
     query = update.callback_query
     await query.answer()
     
-    toggle_feature("project_viewing")
+    db = SessionLocal()
+    SettingsService.toggle_setting(db, "project_viewing")
+    db.close()
     await query.edit_message_text("✅ Project viewing feature toggled!")
     
     return MANAGE_SETTINGS
 
+@instrument_handler
+async def toggle_profiler_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Toggle the sampling profiler for slow updates"""
+    query = update.callback_query
+    await query.answer()
+    
+    enabled = tracing.profiler.toggle()
+    if enabled:
+        text = (
+            f"✅ Profiler enabled. Keeping dumps of the {tracing.profiler.keep} slowest updates "
+            f"in <code>{tracing.profiler.dump_dir}</code>."
+        )
+    else:
+        text = f"⏹ Profiler disabled. {len(tracing.profiler.dumps())} dump(s) kept."
+    await query.edit_message_text(text, parse_mode="HTML")
+    
+    return MANAGE_SETTINGS
+
+@instrument_handler
+async def cycle_page_size(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Cycle the "My Projects" page size through PAGE_SIZE_CHOICES"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = SessionLocal()
+    current = SettingsService.get_setting(db, "projects_page_size") or str(PROJECTS_PAGE_SIZE)
+    choices = [str(size) for size in PAGE_SIZE_CHOICES]
+    next_size = choices[(choices.index(current) + 1) % len(choices)] if current in choices else choices[0]
+    SettingsService.set_setting(db, "projects_page_size", next_size)
+    db.close()
+    
+    # Rendered pages depend on the page size
+    project_list_cache.clear()
+    await query.edit_message_text(f"✅ Projects page size set to {next_size}.")
+    
+    return MANAGE_SETTINGS
+
+@instrument_handler
+async def data_tools(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Show exports and bulk purges"""
+    query = update.callback_query
+    await query.answer()
+    
+    keyboard = [
+        [
+            InlineKeyboardButton("⬇️ Users CSV", callback_data="admin_export_users_csv"),
+            InlineKeyboardButton("⬇️ Users JSONL", callback_data="admin_export_users_jsonl"),
+        ],
+        [
+            InlineKeyboardButton("⬇️ Projects CSV", callback_data="admin_export_projects_csv"),
+            InlineKeyboardButton("⬇️ Projects JSONL", callback_data="admin_export_projects_jsonl"),
+        ],
+        [InlineKeyboardButton("🗑 Purge projects of banned users", callback_data="admin_purge_banned")],
+        [InlineKeyboardButton(f"🗑 Purge projects older than {PURGE_AGE_DAYS} days", callback_data="admin_purge_old")],
+        [InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")],
+    ]
+    
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(
+        "<b>🗄 Data Tools</b>\n\nExports are sent here as files. Purges delete projects and their files. "
+        "Both run in the background; this message shows their progress.\n\n"
+        "To purge a single user's projects: <code>/purgeuser &lt;telegram_id&gt;</code>",
+        reply_markup=reply_markup,
+        parse_mode="HTML"
+    )
+    return DATA_TOOLS
+
+@instrument_handler
+async def start_export(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Run an export job and send the file when it is done"""
+    query = update.callback_query
+    await query.answer()
+    
+    entity, fmt = query.data.split("_")[2:]
+    title = f"Export of {entity} ({fmt.upper()})"
+    await query.edit_message_text(f"⏳ {title} started…")
+    _start_admin_job(context, query.message, EXPORT, {"entity": entity, "format": fmt}, title)
+    return ConversationHandler.END
+
+@instrument_handler
+async def confirm_purge(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Ask before purging projects"""
+    query = update.callback_query
+    await query.answer()
+    
+    target = query.data.split("_")[2]
+    if target == "banned":
+        description = "all projects of banned users"
+    else:
+        description = f"all projects created more than {PURGE_AGE_DAYS} days ago"
+    keyboard = [
+        [InlineKeyboardButton("✅ Yes, purge", callback_data=f"admin_purge_{target}_confirm")],
+        [InlineKeyboardButton("❌ Cancel", callback_data="admin_data")],
+    ]
+    
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(
+        f"⚠️ <b>Delete {description}?</b>\n\nTheir files and archives are removed too. This cannot be undone!",
+        reply_markup=reply_markup,
+        parse_mode="HTML"
+    )
+    return DATA_TOOLS
+
+@instrument_handler
+async def start_purge(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Run a confirmed purge job"""
+    query = update.callback_query
+    await query.answer()
+    
+    if query.data.split("_")[2] == "banned":
+        payload, title = {"banned": True}, "Purge of banned users' projects"
+    else:
+        payload, title = {"older_than_days": PURGE_AGE_DAYS}, f"Purge of projects older than {PURGE_AGE_DAYS} days"
+    await query.edit_message_text(f"⏳ {title} started…")
+    _start_admin_job(context, query.message, PURGE, payload, title)
+    return ConversationHandler.END
+
+@instrument_handler
+async def purge_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /purgeuser <telegram_id> - delete all projects of one user (admins only)."""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ You don't have admin access.")
+        return
+    
+    try:
+        telegram_id = int((context.args or [""])[0])
+    except ValueError:
+        await update.message.reply_text("🗑 Usage: /purgeuser <telegram_id>")
+        return
+    
+    title = f"Purge of projects of user {telegram_id}"
+    message = await update.message.reply_text(f"⏳ {title} started…")
+    _start_admin_job(context, message, PURGE, {"telegram_id": telegram_id}, title)
+
+def _start_admin_job(context: ContextTypes.DEFAULT_TYPE, message, kind: str, payload: dict, title: str) -> None:
+    # Runs after the handler returns so the admin's updates keep flowing while the job works;
+    # like broadcasts, outside the context of the update, whose span has ended by then
+    contextvars.Context().run(context.application.create_task, _run_admin_job(message, kind, payload, title))
+
+def _format_progress(progress: dict) -> str:
+    total = progress.get("total") or 0
+    if "rows" in progress:
+        done, unit = progress["rows"], "rows written"
+    else:
+        done, unit = progress.get("deleted", 0), "projects deleted"
+    percent = f" ({done * 100 // total}%)" if total else ""
+    return f"{done:,} of {total:,} {unit}{percent}"
+
+async def _run_admin_job(message, kind: str, payload: dict, title: str) -> None:
+    """Run a data tools job, keep `message` updated with its progress and deliver the outcome."""
+    last_edit = time.monotonic()
+    
+    async def on_progress(progress):
+        nonlocal last_edit
+        if time.monotonic() - last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        last_edit = time.monotonic()
+        try:
+            await message.edit_text(f"⏳ {title}\n\n{_format_progress(progress)}")
+        except TelegramError as e:
+            print(f"Progress of {title} not shown: {e}")
+    
+    try:
+        result = await run_job(kind, payload, on_progress=on_progress)
+    except JobFailed as e:
+        await message.edit_text(f"❌ {title} failed: {e}")
+        return
+    except Exception as e:
+        print(f"Error in {title}: {e}")
+        await message.edit_text(f"❌ {title} failed: {e}")
+        return
+    
+    if kind == PURGE:
+        # The rows may have gone in a worker process, whose cache invalidation does not reach this one
+        project_list_cache.clear()
+        await message.edit_text(f"✅ {title} finished: {result['deleted']:,} projects deleted.")
+        return
+    await _send_export(message, result, title, f"{payload['entity']}_{datetime.utcnow():%Y%m%d_%H%M}.{payload['format']}")
+
+async def _send_export(message, result: dict, title: str, filename: str) -> None:
+    path = result["path"]
+    size = os.path.getsize(path)
+    if size > MAX_DOCUMENT_BYTES:
+        kept = StorageManager.keep_export(path)
+        await message.edit_text(
+            f"⚠️ {title} finished ({result['rows']:,} rows) but the file is {size / 1024 / 1024:.0f} MB, "
+            f"over Telegram's upload limit. It is kept on the server at {kept} until you delete it."
+        )
+        return
+    try:
+        await message.chat.send_action(ChatAction.UPLOAD_DOCUMENT)
+        await message.reply_document(Path(path), filename=filename, caption=f"📤 {title}: {result['rows']:,} rows")
+        await message.edit_text(f"✅ {title} finished: {result['rows']:,} rows.")
+    except TelegramError as e:
+        print(f"Error sending export: {e}")
+        await message.edit_text(f"❌ Error sending {title}: {e}")
+    finally:
+        os.remove(path)
+
+@instrument_handler
+async def broadcast_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Show recent broadcasts and their delivery counters"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = SessionLocal()
+    broadcasts = BroadcastService.recent(db)
+    db.close()
+    
+    message = "<b>📣 Broadcasts</b>\n\n"
+    keyboard = [[InlineKeyboardButton("✏️ New Broadcast", callback_data="broadcast_new")]]
+    for broadcast in broadcasts:
+        handled = broadcast.delivered + broadcast.failed + broadcast.blocked
+        state = broadcast.status
+        if broadcast.status == RUNNING and not broadcast_engine.is_active(broadcast.id):
+            state += ", waiting for restart"
+        preview = broadcast.text if len(broadcast.text) <= 40 else broadcast.text[:40] + "…"
+        message += (
+            f"<b>#{broadcast.id}</b> ({state}) {broadcast.created_at.strftime('%Y-%m-%d %H:%M')}\n"
+            f"<i>{html.escape(preview)}</i>\n"
+            f"{handled:,} of {broadcast.total:,}: ✅ {broadcast.delivered:,} delivered, "
+            f"❌ {broadcast.failed:,} failed, 🚫 {broadcast.blocked:,} blocked\n\n"
+        )
+        if broadcast.status == RUNNING:
+            keyboard.append([InlineKeyboardButton(f"⏹ Stop #{broadcast.id}", callback_data=f"broadcast_cancel_{broadcast.id}")])
+    if not broadcasts:
+        message += "No broadcasts yet.\n"
+    
+    keyboard.append([InlineKeyboardButton("🔄 Refresh", callback_data="admin_broadcast")])
+    keyboard.append([InlineKeyboardButton("🔙 Back to Admin", callback_data="admin_menu")])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode="HTML")
+    return BROADCAST
+
+@instrument_handler
+async def compose_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Ask for the broadcast message"""
+    query = update.callback_query
+    await query.answer()
+    
+    keyboard = [[InlineKeyboardButton("❌ Cancel", callback_data="admin_broadcast")]]
+    await query.edit_message_text(
+        "✏️ Send me the message to broadcast. Formatting is kept.",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
+    return BROADCAST_COMPOSE
+
+@instrument_handler
+async def preview_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Keep the composed message and ask for confirmation"""
+    message = update.message
+    context.user_data['broadcast_draft'] = (message.text, [entity.to_dict() for entity in message.entities])
+    
+    db = SessionLocal()
+    recipients = BroadcastService.count_recipients(db)
+    db.close()
+    
+    keyboard = [
+        [InlineKeyboardButton(f"✅ Send to {recipients:,} users", callback_data="broadcast_send")],
+        [InlineKeyboardButton("❌ Cancel", callback_data="admin_broadcast")],
+    ]
+    await message.reply_text(
+        "⚠️ <b>Send the message above to every user who is not banned?</b>",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode="HTML"
+    )
+    return BROADCAST
+
+@instrument_handler
+async def send_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Start delivering the confirmed broadcast"""
+    draft = context.user_data.pop('broadcast_draft', None)
+    if draft is None:
+        await update.callback_query.answer("This broadcast was already sent or has expired.")
+        return await broadcast_menu(update, context)
+    
+    db = SessionLocal()
+    broadcast = BroadcastService.create(db, draft[0], draft[1], update.effective_user.id)
+    db.close()
+    broadcast_engine.launch(broadcast.id)
+    return await broadcast_menu(update, context)
+
+@instrument_handler
+async def cancel_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Stop a running broadcast"""
+    broadcast_id = int(update.callback_query.data.rsplit("_", 1)[1])
+    await broadcast_engine.cancel(broadcast_id)
+    return await broadcast_menu(update, context)
+
+@instrument_handler
 async def back_to_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Return to admin menu"""
     return await admin_menu(update, context)
+
+def get_admin_conversation_handler():
+    """Get the conversation handler for the admin panel."""
+    from telegram.ext import CallbackQueryHandler, CommandHandler, MessageHandler, filters
+    
+    back = CallbackQueryHandler(back_to_admin, pattern="^admin_menu$")
+    return ConversationHandler(
+        entry_points=[
+            CommandHandler("admin", admin_menu),
+        ],
+        states={
+            ADMIN_MENU: [
+                CallbackQueryHandler(view_all_users, pattern="^admin_users$"),
+                CallbackQueryHandler(view_all_projects, pattern="^admin_projects$"),
+                CallbackQueryHandler(bot_settings, pattern="^admin_settings$"),
+                CallbackQueryHandler(view_stats, pattern="^admin_stats$"),
+                CallbackQueryHandler(data_tools, pattern="^admin_data$"),
+                CallbackQueryHandler(broadcast_menu, pattern="^admin_broadcast$"),
+            ],
+            VIEW_USERS: [back],
+            VIEW_PROJECTS: [back],
+            VIEW_STATS: [
+                CallbackQueryHandler(view_stats, pattern="^admin_stats$"),
+                back,
+            ],
+            DATA_TOOLS: [
+                CallbackQueryHandler(start_export, pattern="^admin_export_(users|projects)_(csv|jsonl)$"),
+                CallbackQueryHandler(confirm_purge, pattern="^admin_purge_(banned|old)$"),
+                CallbackQueryHandler(start_purge, pattern="^admin_purge_(banned|old)_confirm$"),
+                CallbackQueryHandler(data_tools, pattern="^admin_data$"),
+                back,
+            ],
+            BROADCAST: [
+                CallbackQueryHandler(broadcast_menu, pattern="^admin_broadcast$"),
+                CallbackQueryHandler(compose_broadcast, pattern="^broadcast_new$"),
+                CallbackQueryHandler(send_broadcast, pattern="^broadcast_send$"),
+                CallbackQueryHandler(cancel_broadcast, pattern=r"^broadcast_cancel_\d+$"),
+                back,
+            ],
+            BROADCAST_COMPOSE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, preview_broadcast),
+                CallbackQueryHandler(broadcast_menu, pattern="^admin_broadcast$"),
+            ],
+            MANAGE_SETTINGS: [
+                CallbackQueryHandler(toggle_generation_feature, pattern="^toggle_generation$"),
+                CallbackQueryHandler(toggle_viewing_feature, pattern="^toggle_viewing$"),
+                CallbackQueryHandler(toggle_profiler_mode, pattern="^toggle_profiler$"),
+                CallbackQueryHandler(cycle_page_size, pattern="^cycle_page_size$"),
+                back,
+            ],
+        },
+        fallbacks=[
+            CommandHandler("admin", admin_menu),
+        ],
+        allow_reentry=True,
+    )
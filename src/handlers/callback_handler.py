@@ -1,8 +1,41 @@
 # Callback Handlers - Handle all button clicks
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
-from database.models import SessionLocal
-from database.crud import UserService, ProjectService
+from telegram import Update
+from telegram.ext import ContextTypes, CallbackQueryHandler
+from handlers.start_handler import show_main_menu
 from handlers.project_view_handler import (
-    view_user_projects, show_project_info, download_project, 
-    delete_project_confirm, delete_project
\ No newline at end of file
+    view_user_projects, show_project_info, download_project,
+    delete_project_confirm, delete_project
+)
+from handlers.search_handler import search_page, admin_search_page
+from utils.callback_data import (
+    callback_router, DOWNLOAD_PROJECT, PROJECT_INFO, DELETE_PROJECT, CONFIRM_DELETE,
+    SEARCH_PAGE, ADMIN_SEARCH_PAGE, PROJECTS_PAGE
+)
+
+callback_router.register(DOWNLOAD_PROJECT, download_project, feature="project_viewing")
+callback_router.register(PROJECT_INFO, show_project_info, feature="project_viewing")
+callback_router.register(DELETE_PROJECT, delete_project_confirm, feature="project_viewing")
+callback_router.register(CONFIRM_DELETE, delete_project, feature="project_viewing")
+# Args: cursor created_at (µs since epoch), cursor id, backward flag, page number
+callback_router.register(PROJECTS_PAGE, view_user_projects, arity=4, feature="project_viewing")
+callback_router.register(SEARCH_PAGE, search_page, feature="project_viewing")
+callback_router.register(ADMIN_SEARCH_PAGE, admin_search_page)
+callback_router.register_static("main_menu", show_main_menu)
+callback_router.register_static("back_to_start", show_main_menu)
+callback_router.register_static("view_projects", view_user_projects, feature="project_viewing")
+
+async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Dispatch a button click through the callback router."""
+    query = update.callback_query
+    route, args = callback_router.resolve(query.data or "", update.effective_user.id)
+    
+    if route is None:
+        # Forged, stale or unknown payload: reject without touching the database
+        await query.answer("⚠️ This button has expired. Please open the menu again.", show_alert=True)
+        return
+    
+    await route.handler(update, context, *args)
+
+def get_callback_handler() -> CallbackQueryHandler:
+    """Get the catch-all callback query handler. Register it after conversation handlers."""
+    return CallbackQueryHandler(handle_callback)
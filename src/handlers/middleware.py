@@ -0,0 +1,88 @@
+# Update Gate - Pre-dispatch ban and feature-flag enforcement for every update
+from telegram import Update
+from telegram.ext import ContextTypes, ApplicationHandlerStop, TypeHandler
+from database.models import SessionLocal
+from database.crud import UserService, SettingsService
+from utils.callback_data import callback_router
+from config import ADMIN_IDS
+
+# Updates owned by conversations rather than the callback router
+CALLBACK_FEATURES = {
+    "create_project": "project_generation",
+}
+TEXT_FEATURES = {
+    "➕ Create Project": "project_generation",
+}
+COMMAND_FEATURES = {
+    "myprojects": "project_viewing",
+    "search": "project_viewing",
+}
+
+FEATURE_NAMES = {
+    "project_generation": "Project generation",
+    "project_viewing": "Project viewing",
+}
+
+def feature_enabled(telegram_id: int, feature: str) -> bool:
+    """Whether a feature flag lets this user in; admins always pass."""
+    if telegram_id in ADMIN_IDS:
+        return True
+    db = SessionLocal()
+    try:
+        return SettingsService.is_enabled(db, feature)
+    finally:
+        db.close()
+
+def disabled_text(feature: str) -> str:
+    return f"⏸ {FEATURE_NAMES.get(feature, feature)} is temporarily disabled. Please try again later."
+
+def feature_for_update(update: Update):
+    """Return the feature flag guarding this update, if any."""
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        return CALLBACK_FEATURES.get(data) or callback_router.feature_for(data)
+
+    message = update.message
+    if message and message.text:
+        if message.text.startswith("/"):
+            command = message.text[1:].split(" ", 1)[0].split("@", 1)[0]
+            return COMMAND_FEATURES.get(command)
+        return TEXT_FEATURES.get(message.text)
+    return None
+
+async def _reject(update: Update, text: str) -> None:
+    if update.callback_query:
+        await update.callback_query.answer(text, show_alert=True)
+    elif update.effective_message:
+        await update.effective_message.reply_text(text)
+
+async def gate_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Runs before every other handler. Stops updates from banned users and
+    updates for features an admin has switched off. User status and settings
+    come from in-memory caches, so most updates cost no database query here.
+    """
+    user = update.effective_user
+    if user is None or user.id in ADMIN_IDS:
+        return
+
+    feature = feature_for_update(update)
+    db = SessionLocal()
+    try:
+        status = UserService.get_user_status(db, user.id)
+        feature_enabled = feature is None or SettingsService.is_enabled(db, feature)
+    finally:
+        db.close()
+
+    # Unknown users pass; /start registers them and other handlers report them as not found
+    if status and status.is_banned:
+        await _reject(update, "❌ Sorry, your account has been banned. Please contact support.")
+        raise ApplicationHandlerStop
+
+    if not feature_enabled:
+        await _reject(update, disabled_text(feature))
+        raise ApplicationHandlerStop
+
+def get_gate_handler() -> TypeHandler:
+    """Get the gate handler. Register it in group -1 so it runs before all others."""
+    return TypeHandler(Update, gate_update)
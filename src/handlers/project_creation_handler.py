@@ -1,15 +1,29 @@
 # Project Creation Handlers
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
-from database.models import SessionLocal
-from database.crud import UserService, ProjectService
-from ai_generator.gemini_generator import generator
-from utils.storage import StorageManager
-import os
+from workers.client import run_job, JobFailed
+from workers.tasks import GENERATE
+from utils.cache import project_list_cache
+from utils.callback_data import callback_data, DOWNLOAD_PROJECT
+from utils.metrics import instrument_handler
+from utils.scheduler import generation_scheduler, priority_class
+from handlers.middleware import feature_enabled, disabled_text
+import asyncio
 
 # Conversation states
 ASK_PROJECT_NAME, ASK_PROJECT_DESCRIPTION, GENERATING_PROJECT, PROJECT_CREATED = range(4)
 
+GENERATION_FEATURE = "project_generation"
+
+GENERATING_TEXT = "🚀 *Generating your project...*\n\n⏳ This may take up to 2-3 minutes depending on project complexity."
+
+async def _generation_allowed(update: Update) -> bool:
+    if feature_enabled(update.effective_user.id, GENERATION_FEATURE):
+        return True
+    await update.message.reply_text(disabled_text(GENERATION_FEATURE))
+    return False
+
+@instrument_handler
 async def start_project_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start project creation - Ask for project name."""
     if update.callback_query:
@@ -26,8 +40,12 @@ async def start_project_creation(update: Update, context: ContextTypes.DEFAULT_T
     
     return ASK_PROJECT_NAME
 
+@instrument_handler
 async def ask_project_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Store project name and ask for description."""
+    if not await _generation_allowed(update):
+        return ConversationHandler.END
+    
     project_name = update.message.text.strip()
     
     if not project_name or len(project_name) < 2:
@@ -45,8 +63,13 @@ async def ask_project_description(update: Update, context: ContextTypes.DEFAULT_
     
     return ASK_PROJECT_DESCRIPTION
 
+@instrument_handler
 async def start_generating_project(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Store description and start generating project."""
+    """Store description and queue the project for generation."""
+    # The update gate only guards the entry points; the flag may have been switched off mid-conversation
+    if not await _generation_allowed(update):
+        return ConversationHandler.END
+    
     description = update.message.text.strip()
     
     if not description or len(description) < 10:
@@ -55,92 +78,93 @@ async def start_generating_project(update: Update, context: ContextTypes.DEFAULT
     
     context.user_data['project_description'] = description
     
-    # Show generating message
-    generating_msg = await update.message.reply_text(
-        "🚀 *Generating your project...*\n\n⏳ This may take up to 2-3 minutes depending on project complexity.",
-        parse_mode='Markdown'
-    )
-    
-    context.user_data['generating_msg_id'] = generating_msg.message_id
+    telegram_id = update.effective_user.id
+    project_name = context.user_data['project_name']
+    status = {}
+    message_sent = asyncio.Event()
     
-    # Get user info
-    db = SessionLocal()
-    user = UserService.get_user_by_telegram_id(db, update.effective_user.id)
+    async def run():
+        # The job may be picked up before the status message below exists
+        await message_sent.wait()
+        if "message" in status:
+            await _generate_and_save(status["message"], telegram_id, project_name, description, status["queued"])
     
-    project_name = context.user_data['project_name']
-    project_description = context.user_data['project_description']
+    job = generation_scheduler.submit(telegram_id, run, priority_class(telegram_id))
+    if job is None:
+        await update.message.reply_text(
+            f"⏳ You already have {generation_scheduler.max_queued_per_user} projects in progress. "
+            "Please wait for them to finish before starting another one."
+        )
+        return ConversationHandler.END
     
+    wait = generation_scheduler.estimate_wait(job)
     try:
-        # Generate project using AI
-        project_files = await _generate_project_async(project_name, project_description)
-        
-        if not project_files or not project_files.get('structure'):
-            await update.message.reply_text(
-                "❌ Error generating project. Please try again with a different description."
+        if wait > 0:
+            text = (
+                "🕒 *Your project is queued*\n\n"
+                f"📋 Position: {generation_scheduler.jobs_ahead(job) + 1}\n"
+                f"⏳ Estimated wait: {_format_wait(wait)}\n\n"
+                "I'll update this message when generation starts."
             )
-            db.close()
-            return ConversationHandler.END
-        
-        # Save project to database
-        project_dir = StorageManager.create_project_directory(user.id, len(user.projects) + 1, project_name)
-        
-        # Save files
-        if not StorageManager.save_project_files(project_dir, project_files['structure']):
-            await update.message.reply_text("❌ Error saving project files. Please try again.")
-            db.close()
-            return ConversationHandler.END
-        
-        # Create project record in database
-        db_project = ProjectService.create_project(
-            db,
-            user_id=user.id,
-            name=project_name,
-            description=project_description,
-            file_path=project_dir
-        )
-        
-        # Compress project
-        zip_path = StorageManager.compress_project(project_dir)
-        if zip_path:
-            ProjectService.update_project_zip(db, db_project.id, zip_path)
-        
-        db.commit()
-        db.close()
-        
-        # Edit generating message
-        summary = project_files.get('summary', 'Project generated successfully!')
-        success_text = f"""
-✅ *Project Generated Successfully!*
+        else:
+            text = GENERATING_TEXT
+        status["queued"] = wait > 0
+        status["message"] = await update.message.reply_text(text, parse_mode='Markdown')
+        context.user_data['generating_msg_id'] = status["message"].message_id
+    finally:
+        message_sent.set()
+    
+    return ConversationHandler.END
 
-📦 *Project:* {project_name}
-📝 *Summary:* {summary}
+def _format_wait(seconds: float) -> str:
+    minutes = round(seconds / 60)
+    return "about a minute" if minutes <= 1 else f"about {minutes} minutes"
 
-Your project is ready to download!
-"""
-        
-        keyboard = [
-            [InlineKeyboardButton("📥 Download Project", callback_data=f"download_project_{db_project.id}")],
-            [InlineKeyboardButton("📂 View My Projects", callback_data="view_projects")],
-            [InlineKeyboardButton("➕ Create Another", callback_data="create_project")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await generating_msg.edit_text(success_text, reply_markup=reply_markup, parse_mode='Markdown')
-        
-        return ConversationHandler.END
-        
+async def _generate_and_save(message, telegram_id: int, project_name: str, project_description: str, queued: bool) -> None:
+    """Scheduler job: run the generate job and report progress in `message`."""
+    if queued:
+        await message.edit_text(GENERATING_TEXT, parse_mode='Markdown')
+    
+    try:
+        result = await run_job(GENERATE, {
+            "telegram_id": telegram_id,
+            "project_name": project_name,
+            "description": project_description,
+        })
+    except JobFailed as e:
+        await message.edit_text(f"❌ {e}")
+        return
     except Exception as e:
         print(f"Error in project generation: {e}")
-        await update.message.reply_text(
+        await message.edit_text(
             f"❌ An error occurred while generating the project: {str(e)}\n\nPlease try again."
         )
-        db.close()
-        return ConversationHandler.END
+        return
+    
+    # In queue mode the project was created in a worker process, whose cache invalidation
+    # does not reach this one
+    project_list_cache.invalidate(result['user_id'])
+    
+    # Edit generating message
+    success_text = f"""
+✅ *Project Generated Successfully!*
 
-async def _generate_project_async(project_name: str, description: str) -> dict:
-    """Generate project asynchronously."""
-    return generator.generate_project_files(project_name, description)
+📦 *Project:* {project_name}
+📝 *Summary:* {result['summary']}
+
+Your project is ready to download!
+"""
+    
+    keyboard = [
+        [InlineKeyboardButton("📥 Download Project", callback_data=callback_data(DOWNLOAD_PROJECT, telegram_id, result['project_id']))],
+        [InlineKeyboardButton("📂 View My Projects", callback_data="view_projects")],
+        [InlineKeyboardButton("➕ Create Another", callback_data="create_project")],
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    await message.edit_text(success_text, reply_markup=reply_markup, parse_mode='Markdown')
 
+@instrument_handler
 async def cancel_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancel project creation."""
     await update.message.reply_text("❌ Project creation cancelled.")
@@ -148,11 +172,12 @@ async def cancel_creation(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 def get_creation_conversation_handler():
     """Get the conversation handler for project creation."""
-    from telegram.ext import MessageHandler, filters, CommandHandler
+    from telegram.ext import MessageHandler, filters, CommandHandler, CallbackQueryHandler
     
     return ConversationHandler(
         entry_points=[
             MessageHandler(filters.Regex("^➕ Create Project$"), start_project_creation),
+            CallbackQueryHandler(start_project_creation, pattern="^create_project$"),
         ],
         states={
             ASK_PROJECT_NAME: [
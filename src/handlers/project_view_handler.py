@@ -1,83 +1,147 @@
 # Project Viewing and Management Handlers
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ChatAction
 from database.models import SessionLocal
-from database.crud import UserService, ProjectService
+from database.crud import UserService, ProjectService, SettingsService
 from utils.storage import StorageManager
+from utils.cache import project_list_cache
+from utils.callback_data import (
+    callback_data, DOWNLOAD_PROJECT, PROJECT_INFO, DELETE_PROJECT, CONFIRM_DELETE, PROJECTS_PAGE
+)
+from config import ADMIN_IDS, PROJECTS_PAGE_SIZE
+from utils.metrics import instrument_handler
+from workers.client import run_job, JobFailed
+from workers.tasks import ARCHIVE
 from datetime import datetime
+from pathlib import Path
 import os
 
-async def view_user_projects(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Display user's projects."""
-    if update.callback_query:
-        await update.callback_query.answer()
-        user_id = update.effective_user.id
-        chat_id = update.callback_query.message.chat_id
-    else:
-        user_id = update.message.from_user.id
-        chat_id = update.message.chat_id
-    
-    db = SessionLocal()
-    user = UserService.get_user_by_telegram_id(db, user_id)
-    
-    if not user:
-        await update.callback_query.edit_message_text("❌ User not found.")
-        db.close()
-        return
-    
-    projects = ProjectService.get_user_projects(db, user.id)
-    
-    if not projects:
+PAGE_SIZE_LIMITS = (1, 20)
+# Rendered pages kept per user in project_list_cache; the oldest is dropped beyond this
+MAX_CACHED_PAGES = 5
+
+def _page_size(db) -> int:
+    """Projects per page: the projects_page_size admin setting, else PROJECTS_PAGE_SIZE."""
+    value = SettingsService.get_setting(db, "projects_page_size")
+    try:
+        size = int(value) if value else PROJECTS_PAGE_SIZE
+    except ValueError:
+        size = PROJECTS_PAGE_SIZE
+    return min(max(size, PAGE_SIZE_LIMITS[0]), PAGE_SIZE_LIMITS[1])
+
+def _get_own_project(db, project_id: int, telegram_id: int):
+    """
+    The project, if it belongs to the caller or the caller is an admin. A signed
+    button only proves it was issued to this user; project ids can be reused.
+    """
+    project = ProjectService.get_project(db, project_id)
+    if project is None or telegram_id in ADMIN_IDS:
+        return project
+    user = UserService.get_user_status(db, telegram_id)
+    return project if user is not None and project.user_id == user.user_id else None
+
+def _render_projects_page(db, user_id: int, telegram_id: int, pages: dict, page_size: int,
+                          cursor: tuple, backward: bool, page: int):
+    """Build (text, reply_markup) for one page of the user's projects."""
+    projects, has_more = ProjectService.get_user_projects_page(db, user_id, page_size, cursor, backward)
+    has_prev = has_more if backward else page > 1
+    has_next = True if backward else has_more
+    
+    if not projects and page == 1:
         text = "📂 *Your Projects*\n\nYou haven't created any projects yet.\n\nClick below to create your first project!"
         keyboard = [
             [InlineKeyboardButton("➕ Create Project", callback_data="create_project")],
             [InlineKeyboardButton("◀️ Back", callback_data="main_menu")],
         ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        if update.callback_query:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
-        else:
-            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
-        db.close()
-        return
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    # Count and disk usage only change with the project list, so compute them once per user
+    summary = pages.get("summary")
+    if summary is None:
+        summary = (ProjectService.count_user_projects(db, user_id), StorageManager.get_projects_size(ProjectService.get_user_project_paths(db, user_id)))
+        pages["summary"] = summary
+    total, storage_size = summary
     
     # Build projects list
-    text = "📂 *Your Projects*\n\n"
+    text = f"📂 *Your Projects* ({total})\n\n"
     keyboard = []
     
-    for idx, project in enumerate(projects, 1):
+    for idx, project in enumerate(projects, (page - 1) * page_size + 1):
         created_date = project.created_at.strftime("%d/%m/%Y")
         text += f"{idx}. *{project.name}*\n   📅 Created: {created_date}\n\n"
         
         keyboard.append([
-            InlineKeyboardButton(f"📥 {project.name}", callback_data=f"download_project_{project.id}"),
-            InlineKeyboardButton("ℹ️", callback_data=f"project_info_{project.id}"),
+            InlineKeyboardButton(f"📥 {project.name}", callback_data=callback_data(DOWNLOAD_PROJECT, telegram_id, project.id)),
+            InlineKeyboardButton("ℹ️", callback_data=callback_data(PROJECT_INFO, telegram_id, project.id)),
         ])
     
-    storage_size = StorageManager.get_user_projects_size(user.id)
     text += f"\n📊 *Total Storage:* {storage_size}"
     
+    navigation = []
+    if has_prev and projects:
+        navigation.append(InlineKeyboardButton("◀️ Prev", callback_data=callback_data(
+            PROJECTS_PAGE, telegram_id, *ProjectService.page_cursor(projects[0]), 1, page - 1
+        )))
+    if has_next and projects:
+        navigation.append(InlineKeyboardButton("Next ▶️", callback_data=callback_data(
+            PROJECTS_PAGE, telegram_id, *ProjectService.page_cursor(projects[-1]), 0, page + 1
+        )))
+    if navigation:
+        keyboard.append(navigation)
+    
     keyboard.append([InlineKeyboardButton("➕ Create New Project", callback_data="create_project")])
     keyboard.append([InlineKeyboardButton("◀️ Back", callback_data="main_menu")])
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return text, InlineKeyboardMarkup(keyboard)
+
+@instrument_handler
+async def view_user_projects(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor_micros: int = None,
+                             cursor_id: int = None, backward: int = 0, page: int = 1) -> None:
+    """Display one page of the user's projects."""
+    if update.callback_query:
+        await update.callback_query.answer()
+    user_id = update.effective_user.id
+    
+    db = SessionLocal()
+    user = UserService.get_user_status(db, user_id)
+    
+    if not user:
+        await update.effective_message.reply_text("❌ User not found.")
+        db.close()
+        return
     
+    page_size = _page_size(db)
+    pages = project_list_cache.get(user.user_id)
+    if pages is None:
+        pages = {}
+        project_list_cache.set(user.user_id, pages)
+    
+    page_key = (cursor_micros, cursor_id, backward, page, page_size)
+    rendered = pages.get(page_key)
+    if rendered is None:
+        cursor = ProjectService.parse_page_cursor(cursor_micros, cursor_id) if cursor_id is not None else None
+        rendered = _render_projects_page(db, user.user_id, user_id, pages, page_size, cursor, bool(backward), page)
+        pages[page_key] = rendered
+        page_keys = [key for key in pages if key != "summary"]
+        for key in page_keys[:-MAX_CACHED_PAGES]:
+            del pages[key]
+    db.close()
+    
+    text, reply_markup = rendered
     if update.callback_query:
         await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     else:
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
-    
-    db.close()
 
+@instrument_handler
 async def show_project_info(update: Update, context: ContextTypes.DEFAULT_TYPE, project_id: int) -> None:
     """Show project information."""
     if update.callback_query:
         await update.callback_query.answer()
     
     db = SessionLocal()
-    project = ProjectService.get_project(db, project_id)
+    project = _get_own_project(db, project_id, update.effective_user.id)
     
     if not project:
         await update.callback_query.edit_message_text("❌ Project not found.")
@@ -110,8 +174,8 @@ async def show_project_info(update: Update, context: ContextTypes.DEFAULT_TYPE,
 """
     
     keyboard = [
-        [InlineKeyboardButton("📥 Download", callback_data=f"download_project_{project.id}")],
-        [InlineKeyboardButton("🗑️ Delete", callback_data=f"delete_project_{project.id}")],
+        [InlineKeyboardButton("📥 Download", callback_data=callback_data(DOWNLOAD_PROJECT, update.effective_user.id, project.id))],
+        [InlineKeyboardButton("🗑️ Delete", callback_data=callback_data(DELETE_PROJECT, update.effective_user.id, project.id))],
         [InlineKeyboardButton("◀️ Back", callback_data="view_projects")],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -120,6 +184,7 @@ async def show_project_info(update: Update, context: ContextTypes.DEFAULT_TYPE,
     
     db.close()
 
+@instrument_handler
 async def download_project(update: Update, context: ContextTypes.DEFAULT_TYPE, project_id: int) -> None:
     """Download project as ZIP file."""
     if update.callback_query:
@@ -127,7 +192,7 @@ async def download_project(update: Update, context: ContextTypes.DEFAULT_TYPE, p
         await update.callback_query.message.chat.send_action(ChatAction.UPLOAD_DOCUMENT)
     
     db = SessionLocal()
-    project = ProjectService.get_project(db, project_id)
+    project = _get_own_project(db, project_id, update.effective_user.id)
     
     if not project:
         await update.callback_query.edit_message_text("❌ Project not found.")
@@ -136,20 +201,20 @@ async def download_project(update: Update, context: ContextTypes.DEFAULT_TYPE, p
     
     # Check if ZIP exists
     if not project.zip_path or not os.path.exists(project.zip_path):
-        # Try to create ZIP
-        zip_path = StorageManager.compress_project(project.file_path)
-        if zip_path:
-            ProjectService.update_project_zip(db, project.id, zip_path)
-            db.commit()
-            project.zip_path = zip_path
-        else:
+        # Rebuild the ZIP off the event loop (on a worker process in queue mode)
+        try:
+            result = await run_job(ARCHIVE, {"project_id": project.id})
+        except JobFailed:
             await update.callback_query.edit_message_text("❌ Error preparing project for download.")
             db.close()
             return
+        project.zip_path = result["zip_path"]
+        # The archive may have been built by a worker process, which cannot invalidate this one's cache
+        project_list_cache.invalidate(result["user_id"])
     
     try:
         # Send file
-        file = FSInputFile(project.zip_path)
+        file = Path(project.zip_path)
         await update.callback_query.message.chat.send_document(
             file,
             caption=f"📦 {project.name}.zip",
@@ -174,14 +239,23 @@ async def download_project(update: Update, context: ContextTypes.DEFAULT_TYPE, p
     
     db.close()
 
+@instrument_handler
 async def delete_project_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE, project_id: int) -> None:
     """Confirm project deletion."""
     if update.callback_query:
         await update.callback_query.answer()
     
+    db = SessionLocal()
+    project = _get_own_project(db, project_id, update.effective_user.id)
+    db.close()
+    
+    if not project:
+        await update.callback_query.edit_message_text("❌ Project not found.")
+        return
+    
     keyboard = [
-        [InlineKeyboardButton("✅ Yes, Delete", callback_data=f"confirm_delete_{project_id}")],
-        [InlineKeyboardButton("❌ Cancel", callback_data=f"project_info_{project_id}")],
+        [InlineKeyboardButton("✅ Yes, Delete", callback_data=callback_data(CONFIRM_DELETE, update.effective_user.id, project_id))],
+        [InlineKeyboardButton("❌ Cancel", callback_data=callback_data(PROJECT_INFO, update.effective_user.id, project_id))],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -191,13 +265,14 @@ async def delete_project_confirm(update: Update, context: ContextTypes.DEFAULT_T
         parse_mode='Markdown'
     )
 
+@instrument_handler
 async def delete_project(update: Update, context: ContextTypes.DEFAULT_TYPE, project_id: int) -> None:
     """Delete project."""
     if update.callback_query:
         await update.callback_query.answer()
     
     db = SessionLocal()
-    project = ProjectService.get_project(db, project_id)
+    project = _get_own_project(db, project_id, update.effective_user.id)
     
     if not project:
         await update.callback_query.edit_message_text("❌ Project not found.")
@@ -205,7 +280,7 @@ async def delete_project(update: Update, context: ContextTypes.DEFAULT_TYPE, pro
         return
     
     # Delete files
-    StorageManager.delete_project_directory(project.file_path)
+    StorageManager.delete_project_files(project.file_path, project.zip_path)
     
     # Delete from database
     ProjectService.delete_project(db, project_id)
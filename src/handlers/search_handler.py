@@ -0,0 +1,105 @@
+# Search Handlers - /search for users and /adminsearch for admins
+import html
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from database.models import SessionLocal
+from database.crud import UserService
+from database.search import SearchService
+from utils.callback_data import callback_data, PROJECT_INFO, SEARCH_PAGE, ADMIN_SEARCH_PAGE
+from utils.metrics import instrument_handler
+from config import ADMIN_IDS, SEARCH_PAGE_SIZE
+
+@instrument_handler
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /search <words> - search the user's own projects."""
+    query = " ".join(context.args or []).strip()
+    if not query:
+        await update.message.reply_text("🔎 Usage: /search <words from the project name or description>")
+        return
+    
+    context.user_data['search_query'] = query
+    await _show_results(update, context, page=0, admin=False)
+
+@instrument_handler
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int) -> None:
+    """Show another page of the user's last search."""
+    await update.callback_query.answer()
+    await _show_results(update, context, page=page, admin=False)
+
+@instrument_handler
+async def admin_search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /adminsearch <words> - search all projects (admins only)."""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("❌ You don't have admin access.")
+        return
+    
+    query = " ".join(context.args or []).strip()
+    if not query:
+        await update.message.reply_text("🔎 Usage: /adminsearch <words>")
+        return
+    
+    context.user_data['admin_search_query'] = query
+    await _show_results(update, context, page=0, admin=True)
+
+@instrument_handler
+async def admin_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int) -> None:
+    """Show another page of the admin's last search."""
+    await update.callback_query.answer()
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+    await _show_results(update, context, page=page, admin=True)
+
+async def _show_results(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int, admin: bool) -> None:
+    """Run the search for the stored query and render one page of results."""
+    query = context.user_data.get('admin_search_query' if admin else 'search_query')
+    telegram_id = update.effective_user.id
+    
+    if not query:
+        await update.effective_message.reply_text("🔎 Your search has expired. Please search again.")
+        return
+    
+    db = SessionLocal()
+    owner_id = None
+    if not admin:
+        user = UserService.get_user_status(db, telegram_id)
+        if not user:
+            await update.effective_message.reply_text("❌ User not found.")
+            db.close()
+            return
+        owner_id = user.user_id
+    
+    projects, has_more = SearchService.search_projects(
+        db, query, user_id=owner_id, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE
+    )
+    
+    title = "🔎 <b>Admin Search</b>" if admin else "🔎 <b>Search</b>"
+    text = f"{title}: <i>{html.escape(query)}</i>\n\n"
+    keyboard = []
+    if not projects:
+        text += "No matching projects found." if page == 0 else "No more results."
+    for idx, project in enumerate(projects, page * SEARCH_PAGE_SIZE + 1):
+        text += f"{idx}. <b>{html.escape(project.name)}</b>\n   📅 {project.created_at.strftime('%d/%m/%Y')}"
+        if admin:
+            owner = project.owner
+            text += f" · 👤 {html.escape(owner.username or owner.first_name or '')} (<code>{owner.telegram_id}</code>)"
+        text += "\n"
+        if not admin:
+            keyboard.append([InlineKeyboardButton(
+                f"ℹ️ {project.name}", callback_data=callback_data(PROJECT_INFO, telegram_id, project.id)
+            )])
+    db.close()
+    
+    action = ADMIN_SEARCH_PAGE if admin else SEARCH_PAGE
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("◀️ Prev", callback_data=callback_data(action, telegram_id, page - 1)))
+    if has_more:
+        navigation.append(InlineKeyboardButton("Next ▶️", callback_data=callback_data(action, telegram_id, page + 1)))
+    if navigation:
+        keyboard.append(navigation)
+    reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+    
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+    else:
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
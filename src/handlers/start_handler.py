@@ -4,7 +4,9 @@ from telegram.ext import ContextTypes
 from database.models import SessionLocal
 from database.crud import UserService
 from datetime import datetime
+from utils.metrics import instrument_handler
 
+@instrument_handler
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start command - Welcome message and main menu."""
     user = update.effective_user
@@ -48,6 +50,7 @@ Let's get started! What would you like to do?
     
     await update.message.reply_text(welcome_text, reply_markup=reply_markup)
 
+@instrument_handler
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /help command."""
     help_text = """
@@ -57,6 +60,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 /start - Start the bot and show main menu
 /help - Show this help message
 /myprojects - View your projects
+/search - Search your projects
 /settings - User settings
 
 *Features:*
@@ -82,6 +86,7 @@ Contact support or use /help anytime!
 """
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
+@instrument_handler
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show main menu."""
     keyboard = [
@@ -0,0 +1,122 @@
+# Main - Build the Telegram application, register handlers and start the bot
+import asyncio
+import signal
+from telegram import Update
+from telegram.ext import Application, CommandHandler
+from bootstrap import bootstrap
+from config import (
+    TELEGRAM_BOT_TOKEN, BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH,
+    WEBHOOK_SECRET, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE,
+)
+from utils import metrics
+from utils.scheduler import generation_scheduler
+from utils.broadcast import broadcast_engine, TelegramSender
+from utils.telegram_request import TracedHTTPXRequest
+from utils.webhook import WebhookServer
+
+
+def build_application() -> Application:
+    """Create the application and register all handlers."""
+    from handlers.start_handler import start_command, help_command
+    from handlers.project_view_handler import view_user_projects
+    from handlers.callback_handler import get_callback_handler
+    from handlers.middleware import get_gate_handler
+    from handlers.search_handler import search_command, admin_search_command
+    from handlers.project_creation_handler import get_creation_conversation_handler
+    from handlers.admin_handler import get_admin_conversation_handler, purge_user_command
+    
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(TracedHTTPXRequest())
+        .post_init(_start_broadcasts)
+        .post_shutdown(_stop_background_tasks)
+        .build()
+    )
+    
+    # Ban and feature-flag gate runs before every other handler
+    application.add_handler(get_gate_handler(), group=-1)
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("myprojects", view_user_projects))
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("adminsearch", admin_search_command))
+    application.add_handler(CommandHandler("purgeuser", purge_user_command))
+    application.add_handler(get_creation_conversation_handler())
+    application.add_handler(get_admin_conversation_handler())
+    # Catch-all button router; must come after the conversations that own their buttons
+    application.add_handler(get_callback_handler())
+    
+    metrics.register_gauge("update_queue_depth", application.update_queue.qsize)
+    metrics.register_gauge("generation_queue_depth", generation_scheduler.queued)
+    metrics.register_gauge("generation_running", generation_scheduler.running)
+    metrics.register_gauge("broadcasts_active", broadcast_engine.active)
+    return application
+
+
+async def _start_broadcasts(application: Application) -> None:
+    broadcast_engine.attach(TelegramSender(application.bot))
+    resumed = broadcast_engine.resume()
+    if resumed:
+        print(f"Resumed {resumed} broadcast(s)")
+
+
+async def _stop_background_tasks(application: Application) -> None:
+    await broadcast_engine.stop()
+    await generation_scheduler.stop()
+
+
+async def run_webhook(application: Application) -> None:
+    """Serve updates through the local webhook server until SIGINT/SIGTERM."""
+    async def process_update(data: dict) -> None:
+        await application.process_update(Update.de_json(data, application.bot))
+    
+    server = WebhookServer(
+        process_update,
+        secret_token=WEBHOOK_SECRET,
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        path=WEBHOOK_PATH,
+        workers=WEBHOOK_WORKERS,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+    )
+    metrics.register_gauge("update_queue_depth", server.qsize)
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    async with application:
+        await application.start()
+        # post_init only runs under run_polling/run_webhook
+        await _start_broadcasts(application)
+        await server.start()
+        print(f"Webhook server listening on http://{WEBHOOK_LISTEN}:{server.port}{WEBHOOK_PATH}")
+        # Without WEBHOOK_URL the server only accepts locally posted updates
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_WORKERS,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        
+        await stop_event.wait()
+        
+        await server.stop()
+        await _stop_background_tasks(application)
+        await application.stop()
+
+
+def main() -> None:
+    bootstrap()
+    application = build_application()
+    if BOT_MODE == "webhook":
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Migrate Storage - Move projects from user_<id>/project_<n>_<name> into the id-keyed fan-out layout
+#
+# Usage (from src/; safe to run while the bot is serving users):
+#   python -m tools.migrate_storage --dry-run
+#   python -m tools.migrate_storage --rate 20 --max-mb-per-second 20
+#
+# Each project is hard-linked (or copied, across filesystems) into a staging
+# directory, renamed into its new location, and only then switched over in the
+# database. The old files are removed after the switch, so the bot can read a
+# project at every moment. The run is resumable: migrated projects are skipped.
+import argparse
+import os
+import shutil
+import time
+
+from database.models import SessionLocal, Project
+from database.crud import ProjectService
+from utils.storage import StorageManager, PROJECTS_ROOT
+
+
+def _link_or_copy(src: str, dst: str) -> int:
+    """Hard-link src to dst, copying instead across filesystems. Returns bytes copied."""
+    try:
+        os.link(src, dst)
+        return 0
+    except OSError:
+        shutil.copy2(src, dst)
+        return os.path.getsize(dst)
+
+
+def clone_tree(src_dir: str, dst_dir: str) -> int:
+    """Recreate src_dir's files under dst_dir. Returns bytes copied (0 when all were linked)."""
+    copied = 0
+    for root, dirs, files in os.walk(src_dir):
+        target = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            copied += _link_or_copy(os.path.join(root, name), os.path.join(target, name))
+    return copied
+
+
+class Throttle:
+    """Sleeps as needed to stay under `rate` projects and `max_bytes` copied bytes per second."""
+
+    def __init__(self, rate: float, max_bytes: float):
+        self.rate = rate
+        self.max_bytes = max_bytes
+        self.start = time.monotonic()
+        self.projects = 0
+        self.bytes = 0
+
+    def account(self, copied: int) -> None:
+        self.projects += 1
+        self.bytes += copied
+        earliest = max(
+            self.projects / self.rate if self.rate > 0 else 0,
+            self.bytes / self.max_bytes if self.max_bytes > 0 else 0,
+        )
+        delay = self.start + earliest - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def migrate_project(db, project: Project) -> tuple:
+    """Move one project. Returns (status, bytes copied)."""
+    old_paths = (project.file_path, project.zip_path)
+    if not project.file_path or not os.path.isdir(project.file_path):
+        return "missing", 0
+
+    project_dir = StorageManager.project_directory(project.id, project.name)
+    root = os.path.dirname(project_dir)
+    # Leftovers of an interrupted run are rebuilt from scratch
+    if os.path.exists(root):
+        shutil.rmtree(root)
+
+    staging_dir = StorageManager.create_staging_directory()
+    try:
+        copied = clone_tree(project.file_path, staging_dir)
+        StorageManager.publish_project_directory(staging_dir, project.id, project.name)
+    finally:
+        if os.path.isdir(staging_dir):
+            shutil.rmtree(staging_dir)
+
+    zip_path = None
+    if project.zip_path and os.path.isfile(project.zip_path):
+        zip_path = os.path.join(root, os.path.basename(project.zip_path))
+        copied += _link_or_copy(project.zip_path, zip_path)
+
+    if not ProjectService.move_project_files(db, project.id, old_paths, (project_dir, zip_path)):
+        # The bot changed the project meanwhile; drop the copy and retry on the next run
+        shutil.rmtree(root, ignore_errors=True)
+        return "changed", copied
+
+    StorageManager.delete_project_files(old_paths[0], old_paths[1])
+    return "moved", copied
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Move project files into the fan-out storage layout")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="max projects per second (0 = unlimited)")
+    parser.add_argument("--max-mb-per-second", type=float, default=20,
+                        help="max MB copied per second when hard links are not possible (0 = unlimited)")
+    parser.add_argument("--dry-run", action="store_true", help="only count projects to migrate")
+    args = parser.parse_args(argv)
+
+    throttle = Throttle(args.rate, args.max_mb_per_second * 1024 * 1024)
+    new_root = os.path.abspath(PROJECTS_ROOT) + os.sep
+    counts = {"moved": 0, "missing": 0, "changed": 0, "current": 0}
+    last_id = 0
+
+    while True:
+        db = SessionLocal()
+        try:
+            batch = (
+                db.query(Project).filter(Project.id > last_id)
+                .order_by(Project.id).limit(args.batch_size).all()
+            )
+            if not batch:
+                break
+            for project in batch:
+                last_id = project.id
+                if project.file_path and os.path.abspath(project.file_path).startswith(new_root):
+                    counts["current"] += 1
+                    continue
+                if args.dry_run:
+                    counts["moved" if project.file_path and os.path.isdir(project.file_path) else "missing"] += 1
+                    continue
+                status, copied = migrate_project(db, project)
+                counts[status] += 1
+                throttle.account(copied)
+        finally:
+            db.close()
+        print(f"  up to project {last_id}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+
+    verb = "to move" if args.dry_run else "moved"
+    print(f"Done: {counts['moved']} {verb}, {counts['current']} already migrated, "
+          f"{counts['missing']} without files, {counts['changed']} changed during the run "
+          f"(re-run to retry), {throttle.bytes / 1024 / 1024:.1f} MB copied")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Replay Updates - Post recorded Telegram updates to a local webhook server
+#
+# Usage (from src/, with the bot running in BOT_MODE=webhook):
+#   python -m tools.replay_updates updates.jsonl --secret $WEBHOOK_SECRET
+#   python -m tools.replay_updates updates.json --repeat 50 --concurrency 32
+#
+# The input is a JSON array of updates or one update per line (JSONL).
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+
+from config import WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+from utils.webhook import SECRET_HEADER
+
+
+def load_updates(path: str) -> list:
+    """Load updates from a JSON array or a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def replay(url: str, updates: list, secret: str, concurrency: int) -> Counter:
+    """Post every update, at most `concurrency` at a time, and count response statuses."""
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def post(update):
+            async with semaphore:
+                try:
+                    response = await client.post(url, json=update, headers=headers)
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        await asyncio.gather(*(post(update) for update in updates))
+    return statuses
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded updates against the webhook server")
+    parser.add_argument("file", help="JSON array or JSONL file of Telegram updates")
+    parser.add_argument("--url", default=f"http://{WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--repeat", type=int, default=1, help="post the whole file this many times")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    updates = load_updates(args.file)
+    batch = []
+    for n in range(args.repeat):
+        for update in updates:
+            # Telegram never repeats update_id; keep replays distinct
+            batch.append(dict(update, update_id=update.get("update_id", 0) + n * len(updates)))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(replay(args.url, batch, args.secret, args.concurrency))
+    elapsed = time.perf_counter() - start
+
+    print(f"Posted {len(batch)} updates in {elapsed:.2f}s ({len(batch) / elapsed:.0f}/s)")
+    for status, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+        print(f"  {status}: {count}")
+
+
+if __name__ == "__main__":
+    main()
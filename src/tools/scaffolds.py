@@ -0,0 +1,114 @@
+# Scaffolds - Inspect and edit the scaffold library (ai_generator/scaffolds.json)
+#
+# Usage (from src/):
+#   python -m tools.scaffolds list
+#   python -m tools.scaffolds classify "A FastAPI service for todo lists"
+#   python -m tools.scaffolds unpack flask /tmp/flask          # edit the files there, then
+#   python -m tools.scaffolds pack flask /tmp/flask --title "Flask web app" \
+#       --keywords flask=4 "flask app=2" jinja=1
+#   python -m tools.scaffolds remove flask
+#
+# pack keeps the existing title and keywords of a scaffold unless new ones are given.
+import argparse
+import os
+from pathlib import Path
+
+from ai_generator.scaffolds import library
+
+
+def _parse_keywords(items: list) -> dict:
+    keywords = {}
+    for item in items:
+        keyword, _, weight = item.rpartition("=")
+        if not keyword:
+            raise SystemExit(f"Keywords must look like word=weight, got {item!r}")
+        keywords[keyword.lower()] = int(weight)
+    return keywords
+
+
+def cmd_list(args) -> None:
+    total = 0
+    for name, scaffold in sorted(library.scaffolds.items()):
+        size = sum(len(library.blob(blob)) for blob in scaffold.files.values())
+        total += size
+        print(f"{name:<14} {len(scaffold.files):>3} files {size:>7} bytes  {scaffold.title}")
+    blobs = {blob for s in library.scaffolds.values() for blob in s.files.values()}
+    stored = sum(len(library.blob(blob)) for blob in blobs)
+    print(f"{len(blobs)} blobs, {stored} bytes stored for {total} bytes of files")
+
+
+def cmd_classify(args) -> None:
+    text = " ".join(args.text)
+    for name, score in sorted(library.scores(text).items(), key=lambda item: -item[1]):
+        print(f"{name:<14} {score}")
+    scaffold = library.classify("", text)
+    print(f"-> {scaffold.name if scaffold else 'no scaffold'}")
+
+
+def cmd_pack(args) -> None:
+    root = Path(args.directory)
+    files = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file():
+            files[path.relative_to(root).as_posix()] = path.read_text(encoding="utf-8")
+    if not files:
+        raise SystemExit(f"No files under {root}")
+
+    existing = library.get(args.name)
+    title = args.title or (existing.title if existing else args.name)
+    keywords = _parse_keywords(args.keywords) if args.keywords else (existing.keywords if existing else {})
+    library.add(args.name, title, keywords, files)
+    library.save()
+    print(f"Packed {len(files)} files into scaffold {args.name}")
+
+
+def cmd_unpack(args) -> None:
+    scaffold = library.get(args.name)
+    if scaffold is None:
+        raise SystemExit(f"Unknown scaffold {args.name}")
+    root = Path(args.directory)
+    for path, blob in scaffold.files.items():
+        target = root / path
+        os.makedirs(target.parent, exist_ok=True)
+        target.write_text(library.blob(blob), encoding="utf-8")
+    print(f"Unpacked {len(scaffold.files)} files to {root}")
+
+
+def cmd_remove(args) -> None:
+    library.remove(args.name)
+    library.save()
+    print(f"Removed scaffold {args.name}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the project scaffold library")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list").set_defaults(func=cmd_list)
+
+    classify = commands.add_parser("classify", help="show which scaffold a description picks")
+    classify.add_argument("text", nargs="+")
+    classify.set_defaults(func=cmd_classify)
+
+    pack = commands.add_parser("pack", help="store a directory as a scaffold")
+    pack.add_argument("name")
+    pack.add_argument("directory")
+    pack.add_argument("--title")
+    pack.add_argument("--keywords", nargs="*", help="word=weight or 'some phrase=weight'")
+    pack.set_defaults(func=cmd_pack)
+
+    unpack = commands.add_parser("unpack", help="write a scaffold's files to a directory")
+    unpack.add_argument("name")
+    unpack.add_argument("directory")
+    unpack.set_defaults(func=cmd_unpack)
+
+    remove = commands.add_parser("remove")
+    remove.add_argument("name")
+    remove.set_defaults(func=cmd_remove)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# Broadcast - Deliver admin broadcasts within Telegram's flood limits, resumably
+import asyncio
+import contextvars
+import json
+import time
+from datetime import timedelta
+from telegram import MessageEntity
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from config import (
+    BROADCAST_RATE, BROADCAST_PER_CHAT_INTERVAL, BROADCAST_CONCURRENCY, BROADCAST_BATCH_SIZE,
+    BROADCAST_MAX_ATTEMPTS,
+)
+from database.models import SessionLocal
+from database.broadcasts import BroadcastService, DELIVERED, FAILED, BLOCKED
+from utils import metrics
+
+# Outcomes are written to the database after this many sends, which bounds how many
+# recipients may get the message twice when the bot is killed mid-broadcast
+FLUSH_EVERY = 20
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    seconds = error.retry_after
+    return seconds.total_seconds() if isinstance(seconds, timedelta) else float(seconds)
+
+
+class RateLimiter:
+    """
+    Spaces sends at least 1/rate seconds apart overall and per_chat_interval
+    seconds apart within one chat. retry_after() holds every send back until
+    a flood wait imposed by Telegram is over.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.per_chat_interval = per_chat_interval
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_ready = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        while True:
+            now = time.monotonic()
+            ready = max(self._next_slot, self._paused_until, self._chat_ready.get(chat_id, 0.0))
+            if ready <= now:
+                # No await between the check and the reservation, so waiters cannot race
+                self._next_slot = max(self._next_slot, now) + self.interval
+                self._chat_ready[chat_id] = now + self.per_chat_interval
+                if len(self._chat_ready) > 10_000:
+                    self._chat_ready = {chat: t for chat, t in self._chat_ready.items() if t > now}
+                return
+            await asyncio.sleep(ready - now)
+
+    def retry_after(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class TelegramSender:
+    """Sends broadcast messages with the bot."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def __call__(self, chat_id: int, text: str, entities: list) -> None:
+        await self.bot.send_message(
+            chat_id, text,
+            entities=[MessageEntity.de_json(entity, self.bot) for entity in entities] if entities else None,
+        )
+
+
+class BroadcastEngine:
+    """
+    Runs each running broadcast as a task of the bot's event loop. Recipients
+    come from BroadcastService in batches of `batch_size`; `concurrency`
+    senders share the rate limiter, so a broadcast uses at most `rate` of the
+    bot's sending capacity and user-facing replies keep the rest.
+
+    `send(chat_id, text, entities)` is a coroutine raising telegram.error
+    exceptions, normally a TelegramSender; tests and benchmarks pass a fake.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float, concurrency: int, batch_size: int,
+                 max_attempts: int):
+        self.limiter = RateLimiter(rate, per_chat_interval)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.send = None
+        self._tasks = {}
+
+    def attach(self, send) -> None:
+        self.send = send
+
+    def launch(self, broadcast_id: int) -> None:
+        """Start delivering a broadcast unless it is already being delivered."""
+        task = self._tasks.get(broadcast_id)
+        if task is not None and not task.done():
+            return
+        # Like the scheduler's workers, outside the context of the admin update that launched it
+        self._tasks[broadcast_id] = contextvars.Context().run(asyncio.create_task, self._run(broadcast_id))
+
+    def resume(self) -> int:
+        """Relaunch every broadcast left running by a previous process. Returns how many."""
+        db = SessionLocal()
+        try:
+            broadcast_ids = BroadcastService.running_ids(db)
+        finally:
+            db.close()
+        for broadcast_id in broadcast_ids:
+            self.launch(broadcast_id)
+        return len(broadcast_ids)
+
+    async def join(self, broadcast_id: int) -> None:
+        """Wait until the delivery task of a broadcast ends."""
+        task = self._tasks.get(broadcast_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def is_active(self, broadcast_id: int) -> bool:
+        task = self._tasks.get(broadcast_id)
+        return task is not None and not task.done()
+
+    def active(self) -> int:
+        return sum(1 for task in self._tasks.values() if not task.done())
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Stop a broadcast for good. Returns False if it was not running."""
+        db = SessionLocal()
+        try:
+            cancelled = BroadcastService.cancel(db, broadcast_id)
+        finally:
+            db.close()
+        task = self._tasks.get(broadcast_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return cancelled
+
+    async def stop(self) -> None:
+        """Interrupt all deliveries; they stay running in the database and resume on the next start."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+
+    async def _run(self, broadcast_id: int) -> None:
+        db = SessionLocal()
+        try:
+            broadcast = BroadcastService.get(db, broadcast_id)
+            text, entities = broadcast.text, json.loads(broadcast.entities) if broadcast.entities else None
+        finally:
+            db.close()
+
+        try:
+            while True:
+                db = SessionLocal()
+                try:
+                    recipients = BroadcastService.next_recipients(db, broadcast_id, self.batch_size)
+                finally:
+                    db.close()
+                if not recipients:
+                    break
+                await self._send_batch(broadcast_id, recipients, text, entities)
+        except Exception as e:
+            # Left running in the database; the next start resumes it
+            print(f"Broadcast {broadcast_id} interrupted: {e}")
+            return
+
+        db = SessionLocal()
+        try:
+            BroadcastService.finish(db, broadcast_id)
+        finally:
+            db.close()
+
+    async def _send_batch(self, broadcast_id: int, recipients: list, text: str, entities: list) -> None:
+        pending = iter(recipients)
+        outcomes = []
+
+        def flush():
+            if outcomes:
+                batch = outcomes[:]
+                outcomes.clear()
+                db = SessionLocal()
+                try:
+                    BroadcastService.record(db, broadcast_id, batch)
+                finally:
+                    db.close()
+
+        async def sender():
+            for delivery_id, chat_id, attempts in pending:
+                outcomes.append((delivery_id, *await self._deliver(chat_id, attempts, text, entities)))
+                if len(outcomes) >= FLUSH_EVERY:
+                    flush()
+
+        senders = [asyncio.ensure_future(sender()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*senders)
+        finally:
+            # Stop the other senders if one failed, then save what was sent so far;
+            # also on cancellation, so a resumed broadcast skips everyone reached
+            for task in senders:
+                task.cancel()
+            await asyncio.gather(*senders, return_exceptions=True)
+            flush()
+
+    async def _deliver(self, chat_id: int, attempts: int, text: str, entities: list) -> tuple:
+        """Send to one chat. Returns (status, attempts, error)."""
+        while True:
+            await self.limiter.acquire(chat_id)
+            try:
+                await self.send(chat_id, text, entities)
+                outcome = (DELIVERED, attempts + 1, None)
+            except RetryAfter as e:
+                # Flood waits are Telegram pacing the whole bot, not a failed attempt
+                metrics.inc("broadcast_retry_after_total")
+                self.limiter.retry_after(_retry_seconds(e))
+                continue
+            except Forbidden as e:
+                # The user blocked the bot or deleted their account
+                outcome = (BLOCKED, attempts + 1, str(e))
+            except BadRequest as e:
+                outcome = (FAILED, attempts + 1, str(e))
+            except TelegramError as e:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    await asyncio.sleep(min(2 ** attempts, 30))
+                    continue
+                outcome = (FAILED, attempts, str(e))
+            metrics.inc("broadcast_messages_total", status=outcome[0])
+            return outcome
+
+
+broadcast_engine = BroadcastEngine(
+    BROADCAST_RATE, BROADCAST_PER_CHAT_INTERVAL, BROADCAST_CONCURRENCY, BROADCAST_BATCH_SIZE,
+    BROADCAST_MAX_ATTEMPTS,
+)
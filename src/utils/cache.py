@@ -0,0 +1,63 @@
+# Cache - Bounded LRU caches with per-entry expiry
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from config import USER_CACHE_SIZE, USER_CACHE_TTL, SETTINGS_CACHE_TTL, PROJECT_LIST_CACHE_TTL
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache holding at most `maxsize` entries, each valid for `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CachedUser(NamedTuple):
+    user_id: int
+    is_banned: bool
+
+
+# telegram_id -> CachedUser; invalidated by UserService.ban_user/unban_user
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# setting key -> value; invalidated by SettingsService.set_setting
+settings_cache = TTLCache(256, SETTINGS_CACHE_TTL)
+
+# user_id -> {page key: rendered "My Projects" page}; invalidated when the user's projects change
+project_list_cache = TTLCache(USER_CACHE_SIZE, PROJECT_LIST_CACHE_TTL)
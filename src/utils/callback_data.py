@@ -0,0 +1,135 @@
+# Callback Data - Compact, signed callback_data encoding and a table-driven router
+import base64
+import hashlib
+import hmac
+import time
+from typing import NamedTuple
+from config import TELEGRAM_BOT_TOKEN, CALLBACK_SECRET, CALLBACK_MAX_AGE_HOURS
+
+# Action codes for buttons carrying ids (kept to one character to save payload bytes)
+DOWNLOAD_PROJECT = "d"
+PROJECT_INFO = "i"
+DELETE_PROJECT = "x"
+CONFIRM_DELETE = "X"
+SEARCH_PAGE = "s"
+PROJECTS_PAGE = "p"
+ADMIN_SEARCH_PAGE = "S"
+
+_SEP = ":"
+_SIG_BYTES = 6
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        raise ValueError("callback arguments must be non-negative")
+    if value == 0:
+        return "0"
+    digits = []
+    while value:
+        value, rem = divmod(value, 36)
+        digits.append(_DIGITS[rem])
+    return "".join(reversed(digits))
+
+
+class CallbackPayload(NamedTuple):
+    action: str
+    args: tuple
+    issued_hour: int
+
+
+class Route(NamedTuple):
+    handler: object
+    arity: int
+    feature: str
+
+
+class CallbackRouter:
+    """
+    Maps callback_data to handlers in O(1).
+
+    Buttons carrying ids are encoded as `code:arg...:issued:sig`, numbers in
+    base 36 and the signature in URL-safe base64. The signature is a truncated
+    HMAC over the payload and the Telegram user id the button was issued to,
+    so forged, replayed-to-another-user and stale payloads are rejected before
+    any database access. Fixed buttons such as "main_menu" are plain strings
+    looked up in a second table.
+    """
+
+    def __init__(self, secret: str = None, max_age_hours: int = 24 * 30):
+        self._secret = secret
+        self._key = None
+        self.max_age_hours = max_age_hours
+        self._routes = {}
+        self._static = {}
+
+    @property
+    def key(self) -> bytes:
+        # Derived on first use: the bot token is not needed to import handlers
+        if self._key is None:
+            self._key = hashlib.sha256(f"callback:{self._secret or TELEGRAM_BOT_TOKEN}".encode()).digest()
+        return self._key
+
+    def register(self, code: str, handler, arity: int = 1, feature: str = None) -> None:
+        """Route signed payloads with action `code` and `arity` integer arguments to handler."""
+        if _SEP in code or code in self._routes:
+            raise ValueError(f"Invalid or duplicate callback action: {code}")
+        self._routes[code] = Route(handler, arity, feature)
+
+    def register_static(self, data: str, handler, feature: str = None) -> None:
+        """Route a fixed callback_data string to handler (called without arguments)."""
+        self._static[data] = Route(handler, 0, feature)
+
+    def _sign(self, body: str, user_id: int) -> str:
+        digest = hmac.digest(self.key, f"{user_id}{_SEP}{body}".encode(), "sha256")
+        return base64.urlsafe_b64encode(digest[:_SIG_BYTES]).decode()
+
+    def encode(self, code: str, user_id: int, *args: int) -> str:
+        """Build signed callback_data for `code` issued to Telegram user `user_id`."""
+        route = self._routes.get(code)
+        if route is not None and len(args) != route.arity:
+            raise ValueError(f"Callback action {code} takes {route.arity} argument(s)")
+        issued = to_base36(int(time.time() // 3600))
+        body = _SEP.join((code, *(to_base36(arg) for arg in args), issued))
+        return f"{body}{_SEP}{self._sign(body, user_id)}"
+
+    def decode(self, data: str, user_id: int):
+        """Return the CallbackPayload for valid data, or None if unknown, forged or stale."""
+        body, _, sig = data.rpartition(_SEP)
+        parts = body.split(_SEP)
+        route = self._routes.get(parts[0])
+        if route is None or len(parts) != route.arity + 2:
+            return None
+        if not hmac.compare_digest(sig, self._sign(body, user_id)):
+            return None
+        try:
+            issued_hour = int(parts[-1], 36)
+            args = tuple(int(part, 36) for part in parts[1:-1])
+        except ValueError:
+            return None
+        if int(time.time() // 3600) - issued_hour > self.max_age_hours:
+            return None
+        return CallbackPayload(parts[0], args, issued_hour)
+
+    def feature_for(self, data: str):
+        """Feature flag guarding the button, without verifying the payload."""
+        route = self._static.get(data) or self._routes.get(data.split(_SEP, 1)[0])
+        return route.feature if route else None
+
+    def resolve(self, data: str, user_id: int):
+        """Return (route, args) for callback_data, or (None, None) if it must be rejected."""
+        route = self._static.get(data)
+        if route is not None:
+            return route, ()
+        payload = self.decode(data, user_id)
+        if payload is None:
+            return None, None
+        return self._routes[payload.action], payload.args
+
+
+callback_router = CallbackRouter(CALLBACK_SECRET, CALLBACK_MAX_AGE_HOURS)
+
+
+def callback_data(code: str, user_id: int, *args: int) -> str:
+    """Signed callback_data for a button shown to `user_id`."""
+    return callback_router.encode(code, user_id, *args)
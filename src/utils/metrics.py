@@ -0,0 +1,314 @@
+# Metrics - Low-overhead counters, histograms and gauges with a Prometheus exporter
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import tracing
+
+# Bucket upper bounds; the last implicit bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1_024, 10_240, 102_400, 512_000, 1_048_576, 5_242_880, 10_485_760, 52_428_800)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+TOKEN_BUCKETS = (100, 500, 1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 65_536)
+
+_HELP = {
+    "handler_seconds": ("Handler latency", LATENCY_BUCKETS),
+    "handler_errors_total": ("Handler exceptions", None),
+    "db_queries_per_update": ("Database queries issued while handling one update", COUNT_BUCKETS),
+    "gemini_seconds": ("Gemini generate_content latency", LATENCY_BUCKETS),
+    "gemini_prompt_tokens": ("Gemini prompt tokens per request", TOKEN_BUCKETS),
+    "gemini_output_tokens": ("Gemini output tokens per request", TOKEN_BUCKETS),
+    "generation_wait_seconds": ("Time generation jobs spend queued", LATENCY_BUCKETS),
+    "generation_jobs_total": ("Generation jobs by outcome", None),
+    "jobs_submitted_total": ("Background jobs submitted, by kind and worker mode", None),
+    "broadcast_messages_total": ("Broadcast messages by outcome", None),
+    "broadcast_retry_after_total": ("Flood waits Telegram imposed on broadcast sends", None),
+    "scaffold_generations_total": ("Projects generated on top of a stored scaffold", None),
+    "storage_save_seconds": ("StorageManager.save_project_files duration", LATENCY_BUCKETS),
+    "storage_compress_seconds": ("StorageManager.compress_project duration", LATENCY_BUCKETS),
+    "archive_bytes": ("Size of generated project archives", SIZE_BUCKETS),
+}
+
+
+class _Shard:
+    """Per-thread aggregation buffer. Only its owning thread writes to it."""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """
+    Collects metrics into per-thread shards so recording never takes a lock.
+    Shards are merged only when a snapshot is requested (admin stats, /metrics).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._gauges = {}
+        self._gauge_callbacks = {}
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = None, **labels) -> None:
+        """Record one observation in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        histograms = self._shard().histograms
+        entry = histograms.get(key)
+        if entry is None:
+            buckets = buckets or _HELP.get(name, (None, LATENCY_BUCKETS))[1] or LATENCY_BUCKETS
+            entry = [buckets, [0] * (len(buckets) + 1), 0, 0.0]
+            histograms[key] = entry
+        entry[1][bisect.bisect_left(entry[0], value)] += 1
+        entry[2] += 1
+        entry[3] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to its current value."""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def register_gauge(self, name: str, callback) -> None:
+        """Register a gauge whose value is read from callback() at snapshot time."""
+        self._gauge_callbacks[(name, ())] = callback
+
+    def snapshot(self) -> dict:
+        """Merge all shards into {"counters", "histograms", "gauges"}."""
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        counters = {}
+        histograms = {}
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, (buckets, bucket_counts, count, total) in list(shard.histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = [buckets, list(bucket_counts), count, total]
+                else:
+                    merged[1] = [a + b for a, b in zip(merged[1], bucket_counts)]
+                    merged[2] += count
+                    merged[3] += total
+
+        gauges = dict(self._gauges)
+        for key, callback in list(self._gauge_callbacks.items()):
+            try:
+                gauges[key] = callback()
+            except Exception as e:
+                print(f"Error reading gauge {key[0]}: {e}")
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def reset(self) -> None:
+        """Drop all recorded values (used by benchmarks and tools)."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+        self._gauges.clear()
+
+
+registry = MetricsRegistry()
+inc = registry.inc
+observe = registry.observe
+set_gauge = registry.set_gauge
+register_gauge = registry.register_gauge
+snapshot = registry.snapshot
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation helpers
+# ---------------------------------------------------------------------------
+
+# Number of DB queries issued by the update currently being handled
+_db_queries = contextvars.ContextVar("db_queries", default=None)
+
+
+def count_db_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    """SQLAlchemy before_cursor_execute listener counting queries per update."""
+    counter = _db_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def timed(name: str, **labels):
+    """Decorator recording the duration of a sync or async function in a histogram."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(name, time.perf_counter() - start, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+def instrument_handler(func):
+    """
+    Decorator for Telegram handlers: records latency, exceptions and the
+    number of database queries issued while handling the update, and
+    traces the update (see utils.tracing).
+    """
+    handler_name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Handlers calling other handlers share the outermost query counter
+        outermost = _db_queries.get() is None
+        if outermost:
+            counter = [0]
+            token = _db_queries.set(counter)
+        start = time.perf_counter()
+        try:
+            with tracing.update_span(handler_name):
+                return await tracing.profiled(func(*args, **kwargs))
+        except Exception:
+            inc("handler_errors_total", handler=handler_name)
+            raise
+        finally:
+            observe("handler_seconds", time.perf_counter() - start, handler=handler_name)
+            if outermost:
+                observe("db_queries_per_update", counter[0], handler=handler_name)
+                _db_queries.reset(token)
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """Render the current snapshot in the Prometheus text exposition format."""
+    snap = snapshot()
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            help_text = _HELP.get(name, (name.replace("_", " "), None))[0]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(snap["counters"].items()):
+        describe(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), (buckets, bucket_counts, count, total) in sorted(snap["histograms"].items()):
+        describe(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for (name, labels), value in sorted(snap["gauges"].items()):
+        describe(name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _quantile(buckets: tuple, bucket_counts: list, count: int, q: float) -> float:
+    """Estimate a quantile as the upper bound of the bucket containing it."""
+    if not count:
+        return 0.0
+    target = q * count
+    cumulative = 0
+    for bound, bucket_count in zip(buckets, bucket_counts):
+        cumulative += bucket_count
+        if cumulative >= target:
+            return bound
+    return float("inf")
+
+
+def summarize(name: str) -> list:
+    """
+    Summarize a histogram per label set as dicts with
+    labels, count, avg, p50 and p95 (sorted by count, busiest first).
+    """
+    rows = []
+    for (hist_name, labels), (buckets, bucket_counts, count, total) in snapshot()["histograms"].items():
+        if hist_name != name or not count:
+            continue
+        rows.append({
+            "labels": dict(labels),
+            "count": count,
+            "avg": total / count,
+            "p50": _quantile(buckets, bucket_counts, count, 0.50),
+            "p95": _quantile(buckets, bucket_counts, count, 0.95),
+        })
+    rows.sort(key=lambda row: row["count"], reverse=True)
+    return rows
+
+
+
+# ---------------------------------------------------------------------------
+# HTTP exporter
+# ---------------------------------------------------------------------------
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent; keep them out of the bot log
+        pass
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on addr:port from a daemon thread."""
+    server = ThreadingHTTPServer((addr, port), _MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,229 @@
+# Scheduler - Weighted fair queuing of generation jobs across users
+import asyncio
+import contextvars
+import itertools
+import time
+from collections import deque
+from config import (
+    ADMIN_IDS, PREMIUM_USER_IDS, GENERATION_SLOTS, GENERATION_MAX_QUEUED_PER_USER,
+    GENERATION_ESTIMATE_SECONDS, ADMIN_PRIORITY_WEIGHT, PREMIUM_PRIORITY_WEIGHT,
+)
+from utils import metrics
+
+ADMIN = "admin"
+PREMIUM = "premium"
+NORMAL = "normal"
+
+
+def priority_class(telegram_id: int) -> str:
+    if telegram_id in ADMIN_IDS:
+        return ADMIN
+    if telegram_id in PREMIUM_USER_IDS:
+        return PREMIUM
+    return NORMAL
+
+
+class Job:
+    """One queued unit of work. `run` is an async callable taking no arguments."""
+
+    __slots__ = ("id", "user_id", "priority", "run", "future", "queued_at", "started_at")
+
+    def __init__(self, job_id: int, user_id: int, priority: str, run):
+        self.id = job_id
+        self.user_id = user_id
+        self.priority = priority
+        self.run = run
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued_at = time.monotonic()
+        self.started_at = None
+
+
+class FairScheduler:
+    """
+    Runs at most `slots` jobs at once and never more than one per user.
+
+    Users are served by stride scheduling: each user carries a virtual "pass"
+    that advances by 1/weight whenever one of their jobs starts, and the
+    waiting user with the lowest pass goes next. Users of equal weight are
+    therefore served round-robin however many jobs each has queued, and a
+    user of weight 4 gets four turns for every turn of a weight-1 user. A user
+    who was idle rejoins at the current virtual time, so idling does not bank
+    credit.
+    """
+
+    def __init__(self, slots: int, weights: dict, max_queued_per_user: int,
+                 estimate_seconds: float = 60.0):
+        self.slots = slots
+        self.weights = weights
+        self.max_queued_per_user = max_queued_per_user
+        self._queues = {}
+        self._pass = {}
+        self._active = set()
+        self._vtime = 0.0
+        self._ids = itertools.count(1)
+        self._wakeup = None
+        self._workers = []
+        # Exponentially weighted average of job run time, used for wait estimates
+        self.avg_seconds = estimate_seconds
+
+    # -- queue state ---------------------------------------------------------
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def running(self) -> int:
+        return len(self._active)
+
+    def queued_for(self, user_id: int) -> int:
+        return len(self._queues.get(user_id, ())) + (user_id in self._active)
+
+    def submit(self, user_id: int, run, priority: str = NORMAL):
+        """
+        Queue `run` for `user_id` and return its Job, or None if the user
+        already has `max_queued_per_user` jobs waiting or running.
+        """
+        if self.queued_for(user_id) >= self.max_queued_per_user:
+            metrics.inc("generation_jobs_total", status="rejected")
+            return None
+        self._ensure_started()
+        self._prune()
+
+        job = Job(next(self._ids), user_id, priority, run)
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = deque()
+            if user_id not in self._active:
+                self._pass[user_id] = max(self._pass.get(user_id, 0.0), self._vtime)
+        queue.append(job)
+        metrics.inc("generation_jobs_total", status="queued")
+        self._wakeup.set()
+        return job
+
+    def _prune(self) -> None:
+        # Idle users whose pass the virtual clock has overtaken would rejoin at
+        # the current time anyway, so their entry can go
+        if len(self._pass) <= 2 * (len(self._queues) + len(self._active)) + 64:
+            return
+        for user_id in [uid for uid, value in self._pass.items()
+                        if value <= self._vtime and uid not in self._queues and uid not in self._active]:
+            del self._pass[user_id]
+
+    def _stride(self, job: Job) -> float:
+        return 1.0 / self.weights.get(job.priority, 1)
+
+    def _pick(self):
+        """Pop the next job to run, or None if nothing is eligible."""
+        best = None
+        for user_id, queue in self._queues.items():
+            if user_id in self._active:
+                continue
+            key = (self._pass[user_id], queue[0].id)
+            if best is None or key < best[0]:
+                best = (key, user_id)
+        if best is None:
+            return None
+
+        user_id = best[1]
+        queue = self._queues[user_id]
+        job = queue.popleft()
+        if not queue:
+            del self._queues[user_id]
+        self._vtime = self._pass[user_id]
+        self._pass[user_id] += self._stride(job)
+        self._active.add(user_id)
+        return job
+
+    # -- estimates -----------------------------------------------------------
+
+    def jobs_ahead(self, job: Job) -> int:
+        """
+        Number of queued jobs that start before `job`, found by replaying the
+        stride order on a copy of the queue state (running jobs not counted).
+        """
+        passes = dict(self._pass)
+        queues = {user_id: list(queue) for user_id, queue in self._queues.items()}
+        ahead = 0
+        while queues:
+            user_id = min(queues, key=lambda uid: (passes[uid], queues[uid][0].id))
+            picked = queues[user_id].pop(0)
+            if picked is job:
+                return ahead
+            passes[user_id] += self._stride(picked)
+            if not queues[user_id]:
+                del queues[user_id]
+            ahead += 1
+        return ahead
+
+    def estimate_wait(self, job: Job) -> float:
+        """Rough seconds until `job` starts."""
+        if job.started_at is not None:
+            return 0.0
+        ahead = self.jobs_ahead(job)
+        free = self.slots - self.running()
+        if ahead < free:
+            return 0.0
+        # Each round of `slots` jobs takes about one average job duration
+        return ((ahead - free) // self.slots + 1) * self.avg_seconds
+
+    # -- workers -------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        # Workers start in an empty context so they do not inherit the span of
+        # whichever update happened to submit the first job
+        self._workers = [
+            contextvars.Context().run(asyncio.create_task, self._worker()) for _ in range(self.slots)
+        ]
+
+    async def _next_job(self) -> Job:
+        while True:
+            job = self._pick()
+            if job is not None:
+                return job
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next_job()
+            job.started_at = time.monotonic()
+            metrics.observe("generation_wait_seconds", job.started_at - job.queued_at, priority=job.priority)
+            try:
+                result = await job.run()
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                print(f"Generation job {job.id} failed: {e}")
+                metrics.inc("generation_jobs_total", status="failed")
+                job.future.set_exception(e)
+            else:
+                metrics.inc("generation_jobs_total", status="done")
+                job.future.set_result(result)
+            finally:
+                elapsed = time.monotonic() - job.started_at
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+                self._active.discard(job.user_id)
+                self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Cancel workers; queued jobs are dropped."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for queue in self._queues.values():
+            for job in queue:
+                job.future.cancel()
+        self._queues.clear()
+        self._active.clear()
+
+
+generation_scheduler = FairScheduler(
+    slots=GENERATION_SLOTS,
+    weights={ADMIN: ADMIN_PRIORITY_WEIGHT, PREMIUM: PREMIUM_PRIORITY_WEIGHT, NORMAL: 1},
+    max_queued_per_user=GENERATION_MAX_QUEUED_PER_USER,
+    estimate_seconds=GENERATION_ESTIMATE_SECONDS,
+)
@@ -1,21 +1,65 @@
 # Storage and Compression Utilities
+import hashlib
 import os
+import tempfile
+import uuid
 import zipfile
 import shutil
 from pathlib import Path
 from config import PROJECTS_STORAGE_DIR
+from utils import metrics, tracing
 from datetime import datetime
 
+# Projects live at PROJECTS_STORAGE_DIR/projects/<h0h1>/<h2h3>/<project id>/ where h is the
+# sha256 of the id: two levels of 256-way fan-out keep every directory small
+PROJECTS_ROOT = os.path.join(PROJECTS_STORAGE_DIR, "projects")
+# Files are written here first and renamed into place once complete
+STAGING_ROOT = os.path.join(PROJECTS_STORAGE_DIR, "tmp")
+# Exports too large to send through Telegram are kept here; storage GC never touches it
+EXPORTS_ROOT = os.path.join(PROJECTS_STORAGE_DIR, "exports")
+# Pre-fan-out layout: user_<id>/project_<n>_<name>; read until `tools.migrate_storage` has run
+LEGACY_PREFIX = "user_"
+
+def _sanitize(project_name: str) -> str:
+    return "".join(c for c in project_name if c.isalnum() or c in ('-', '_')).rstrip() or "project"
+
 class StorageManager:
     @staticmethod
-    def create_project_directory(user_id: int, project_id: int, project_name: str) -> str:
-        """Create a directory for storing project files."""
-        sanitized_name = "".join(c for c in project_name if c.isalnum() or c in ('-', '_')).rstrip()
-        project_dir = os.path.join(PROJECTS_STORAGE_DIR, f"user_{user_id}", f"project_{project_id}_{sanitized_name}")
-        os.makedirs(project_dir, exist_ok=True)
+    def project_root(project_id: int) -> str:
+        """Directory holding everything stored for a project."""
+        digest = hashlib.sha256(str(project_id).encode()).hexdigest()
+        return os.path.join(PROJECTS_ROOT, digest[:2], digest[2:4], str(project_id))
+    
+    @staticmethod
+    def project_directory(project_id: int, project_name: str) -> str:
+        """Final location of a project's files."""
+        return os.path.join(StorageManager.project_root(project_id), _sanitize(project_name))
+    
+    @staticmethod
+    @tracing.traced("storage.create_staging_directory")
+    def create_staging_directory() -> str:
+        """Create an empty private directory to write a project into before publishing it."""
+        os.makedirs(STAGING_ROOT, exist_ok=True)
+        return tempfile.mkdtemp(dir=STAGING_ROOT)
+    
+    @staticmethod
+    @tracing.traced("storage.publish_project_directory")
+    def publish_project_directory(staging_dir: str, project_id: int, project_name: str) -> str:
+        """
+        Atomically move a fully written staging directory to the project's final
+        location and return that path. Readers never see a half-written project.
+        """
+        project_dir = StorageManager.project_directory(project_id, project_name)
+        root = os.path.dirname(project_dir)
+        # Project ids are never reused, so the root is new; fail rather than mix with existing files
+        os.makedirs(root)
+        # Same filesystem as the staging root, so this is a single rename
+        os.rename(staging_dir, project_dir)
         return project_dir
     
     @staticmethod
+    @tracing.traced("storage.save_project_files")
+    @metrics.timed("storage_save_seconds")
     def save_project_files(project_dir: str, files_structure: dict) -> bool:
         """
         Save project files to the project directory.
@@ -38,6 +82,8 @@ class StorageManager:
             return False
     
     @staticmethod
+    @tracing.traced("storage.compress_project")
+    @metrics.timed("storage_compress_seconds")
     def compress_project(project_dir: str) -> str:
         """Compress project directory into a ZIP file."""
         try:
@@ -46,37 +92,45 @@ class StorageManager:
             project_name = os.path.basename(project_dir)
             zip_path = os.path.join(os.path.dirname(project_dir), f"{project_name}_{timestamp}.zip")
             
-            # Create ZIP file
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            # Build the archive under a temporary name so a crash never leaves a truncated ZIP
+            tmp_path = f"{zip_path}.{uuid.uuid4().hex}.tmp"
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for root, dirs, files in os.walk(project_dir):
                     for file in files:
                         file_path = os.path.join(root, file)
                         arcname = os.path.relpath(file_path, os.path.dirname(project_dir))
                         zipf.write(file_path, arcname)
+            os.replace(tmp_path, zip_path)
             
+            metrics.observe("archive_bytes", os.path.getsize(zip_path))
             return zip_path
         except Exception as e:
             print(f"Error compressing project: {e}")
             return None
     
     @staticmethod
-    def get_user_projects_size(user_id: int) -> str:
-        """Get total size of user's projects."""
-        user_dir = os.path.join(PROJECTS_STORAGE_DIR, f"user_{user_id}")
-        if not os.path.exists(user_dir):
-            return "0 MB"
-        
-        total_size = sum(
-            os.path.getsize(os.path.join(dirpath, filename))
-            for dirpath, dirnames, filenames in os.walk(user_dir)
-            for filename in filenames
-        )
+    @tracing.traced("storage.get_projects_size")
+    def get_projects_size(paths) -> str:
+        """Get total size of the given project directories and archives."""
+        total_size = 0
+        for path in paths:
+            if not path or not os.path.exists(path):
+                continue
+            if os.path.isfile(path):
+                total_size += os.path.getsize(path)
+                continue
+            total_size += sum(
+                os.path.getsize(os.path.join(dirpath, filename))
+                for dirpath, dirnames, filenames in os.walk(path)
+                for filename in filenames
+            )
         
         # Convert to MB
         size_mb = total_size / (1024 * 1024)
         return f"{size_mb:.2f} MB"
     
     @staticmethod
+    @tracing.traced("storage.delete_project_directory")
     def delete_project_directory(project_dir: str) -> bool:
         """Delete project directory and all files."""
         try:
@@ -86,3 +140,66 @@ class StorageManager:
         except Exception as e:
             print(f"Error deleting project: {e}")
             return False
+    
+    @staticmethod
+    @tracing.traced("storage.delete_project_files")
+    def delete_project_files(file_path: str, zip_path: str = None) -> bool:
+        """Delete a project's files and archive, and its project root once empty."""
+        deleted = StorageManager.delete_project_directory(file_path) if file_path else True
+        try:
+            if zip_path and os.path.exists(zip_path):
+                os.remove(zip_path)
+            if file_path:
+                os.rmdir(os.path.dirname(file_path))
+        except OSError:
+            # Root still holds other files, or is a legacy user directory
+            pass
+        return deleted
+    
+    @staticmethod
+    def create_export_path(filename: str) -> str:
+        """Unique path for an admin export file; unsent leftovers are collected like staging directories."""
+        os.makedirs(STAGING_ROOT, exist_ok=True)
+        return os.path.join(STAGING_ROOT, f"export_{uuid.uuid4().hex[:8]}_{filename}")
+    
+    @staticmethod
+    def keep_export(path: str) -> str:
+        """Move an export file out of the staging area, where GC would remove it, into EXPORTS_ROOT."""
+        os.makedirs(EXPORTS_ROOT, exist_ok=True)
+        kept = os.path.join(EXPORTS_ROOT, os.path.basename(path))
+        os.replace(path, kept)
+        return kept
+    
+    @staticmethod
+    def max_stored_project_id() -> int:
+        """Highest project id that has a directory in the fan-out layout, or 0."""
+        highest = 0
+        if os.path.isdir(PROJECTS_ROOT):
+            for first in os.scandir(PROJECTS_ROOT):
+                for second in os.scandir(first.path) if first.is_dir() else ():
+                    for root in os.scandir(second.path) if second.is_dir() else ():
+                        if root.name.isdigit():
+                            highest = max(highest, int(root.name))
+        return highest
+    
+    @staticmethod
+    def iter_storage_entries():
+        """
+        Yield (path, mtime) for every stored item that belongs to one project:
+        project directories, archives and staging directories, in both layouts,
+        plus export files left behind by an admin export.
+        """
+        roots = []
+        if os.path.isdir(STAGING_ROOT):
+            roots.append(STAGING_ROOT)
+        if os.path.isdir(PROJECTS_ROOT):
+            for first in os.scandir(PROJECTS_ROOT):
+                for second in os.scandir(first.path) if first.is_dir() else ():
+                    for root in os.scandir(second.path) if second.is_dir() else ():
+                        roots.append(root.path)
+        if os.path.isdir(PROJECTS_STORAGE_DIR):
+            roots += [entry.path for entry in os.scandir(PROJECTS_STORAGE_DIR)
+                      if entry.is_dir() and entry.name.startswith(LEGACY_PREFIX)]
+        for root in roots:
+            for entry in os.scandir(root):
+                yield entry.path, entry.stat().st_mtime
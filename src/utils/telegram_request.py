@@ -0,0 +1,11 @@
+# Telegram Request - HTTPX request backend with tracing of outbound Bot API calls
+from telegram.request import HTTPXRequest
+from utils import tracing
+
+
+class TracedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that records every Bot API call as a child span of the current update."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        with tracing.span(f"telegram.{url.rsplit('/', 1)[-1]}"):
+            return await super().do_request(url, method, *args, **kwargs)
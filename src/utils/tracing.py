@@ -0,0 +1,249 @@
+# Tracing - Per-update span trees, slow-update logging and an opt-in sampling profiler
+import contextlib
+import contextvars
+import cProfile
+import functools
+import heapq
+import inspect
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from config import SLOW_UPDATE_THRESHOLD_MS, PROFILE_DUMP_DIR, PROFILE_KEEP, PROFILE_SAMPLE_RATE
+
+# Span of the update currently being handled (None outside of updates)
+_current_span = contextvars.ContextVar("current_span", default=None)
+# cProfile.Profile of the update currently being handled, if it was sampled
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class Span:
+    """A timed unit of work with child spans."""
+
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: dict = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def render(self, root_start: float = None, depth: int = 0) -> str:
+        """Render this span and its children as an indented tree."""
+        root_start = self.start if root_start is None else root_start
+        attrs = " ".join(f"{k}={v}" for k, v in self.attrs.items())
+        lines = [
+            f"{'  ' * depth}{self.name} {self.duration * 1000:.1f}ms "
+            f"(+{(self.start - root_start) * 1000:.1f}ms){' ' + attrs if attrs else ''}"
+        ]
+        for child in self.children:
+            lines.append(child.render(root_start, depth + 1))
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """
+    Open a child span of the current update. Outside of an update this is a
+    no-op, so instrumented code paths cost almost nothing when not traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator wrapping a sync or async function in a child span."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SlowProfiler:
+    """
+    Sampling profiler toggled at runtime by admins. While enabled, sampled
+    updates run under cProfile and the pstats dumps of the N slowest are kept.
+    """
+
+    def __init__(self, dump_dir: str, keep: int, sample_rate: float):
+        self.dump_dir = dump_dir
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._active = False
+        self._slowest = []  # min-heap of (duration, path)
+
+    def toggle(self) -> bool:
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def start(self):
+        """
+        Return a cProfile.Profile for this update, or None if not sampled. It is
+        not enabled yet; profiled() enables it while the update's own code runs.
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        # Only one profiler can be attached to the interpreter at a time
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+        return cProfile.Profile()
+
+    def finish(self, profile, name: str, duration: float) -> None:
+        """Stop profiling and keep the dump if it is among the N slowest."""
+        profile.disable()
+        try:
+            with self._lock:
+                if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+                    return
+                os.makedirs(self.dump_dir, exist_ok=True)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                path = os.path.join(self.dump_dir, f"{timestamp}_{name}_{duration * 1000:.0f}ms.pstats")
+                profile.dump_stats(path)
+                heapq.heappush(self._slowest, (duration, path))
+                if len(self._slowest) > self.keep:
+                    _, evicted = heapq.heappop(self._slowest)
+                    with contextlib.suppress(OSError):
+                        os.remove(evicted)
+        except OSError as e:
+            print(f"Error writing profile dump: {e}")
+        finally:
+            self._active = False
+
+    def dumps(self) -> list:
+        """Paths of the kept dumps, slowest first."""
+        return [path for _, path in sorted(self._slowest, reverse=True)]
+
+
+profiler = SlowProfiler(PROFILE_DUMP_DIR, PROFILE_KEEP, PROFILE_SAMPLE_RATE)
+
+
+class _ProfiledCoroutine:
+    """
+    Awaits a coroutine with a profile enabled only while the coroutine itself
+    runs. While it is suspended other tasks run on the event loop, and a
+    profile left enabled would attribute their work to this update.
+    """
+
+    def __init__(self, coro, profile):
+        self._coro = coro
+        self._profile = profile
+
+    def __await__(self):
+        resume, value = self._coro.send, None
+        while True:
+            # Another profiling tool may be attached; such a step goes unprofiled
+            with contextlib.suppress(ValueError):
+                self._profile.enable()
+            try:
+                yielded = resume(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._profile.disable()
+            try:
+                value = yield yielded
+                resume = self._coro.send
+            except BaseException as e:
+                # Cancellation and other errors are delivered to the coroutine, as by a plain await
+                resume, value = self._coro.throw, e
+
+
+def profiled(coro):
+    """Await `coro` under the current update's profile, if the update was sampled."""
+    profile = _current_profile.get()
+    return coro if profile is None else _ProfiledCoroutine(coro, profile)
+
+
+@contextlib.contextmanager
+def update_span(name: str):
+    """
+    Root span for one incoming update. Nested handler calls become child spans.
+    When the update exceeds SLOW_UPDATE_THRESHOLD_MS its span tree is logged.
+    A sampled update's profile is set for profiled() to await the handler with.
+    """
+    if _current_span.get() is not None:
+        # Nested handlers run inside the outer handler's profiled steps
+        profile_token = _current_profile.set(None)
+        try:
+            with span(name) as child:
+                yield child
+        finally:
+            _current_profile.reset(profile_token)
+        return
+
+    root = Span(name)
+    token = _current_span.set(root)
+    profile = profiler.start()
+    profile_token = _current_profile.set(profile)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current_profile.reset(profile_token)
+        _current_span.reset(token)
+        duration = root.duration
+        if profile is not None:
+            profiler.finish(profile, name, duration)
+        if duration * 1000 >= SLOW_UPDATE_THRESHOLD_MS:
+            print(f"Slow update ({duration * 1000:.0f}ms):\n{root.render()}")
+
+
+# ---------------------------------------------------------------------------
+# SQLAlchemy integration
+# ---------------------------------------------------------------------------
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Open a db.query span; closed by after_cursor_execute, or handle_error if the statement fails."""
+    parent = _current_span.get()
+    if parent is None or context is None:
+        return
+    child = Span("db.query", {"sql": " ".join(statement.split())[:60]})
+    parent.children.append(child)
+    # Kept on the statement's execution context, so a failed statement cannot leave it
+    # behind on the pooled connection for a later query to close
+    context._trace_span = child
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _end_statement_span(context)
+
+
+def handle_error(exception_context) -> None:
+    _end_statement_span(exception_context.execution_context)
+
+
+def _end_statement_span(context) -> None:
+    child = getattr(context, "_trace_span", None)
+    if child is not None:
+        child.end = time.perf_counter()
+        context._trace_span = None
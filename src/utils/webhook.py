@@ -0,0 +1,226 @@
+# Webhook Server - Minimal async HTTP endpoint feeding a bounded update queue
+import asyncio
+import hmac
+import json
+from utils import metrics
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+def route_key(data: dict):
+    """
+    Chat id of a raw update, else the id of the user who sent it, else None:
+    the effective_chat/effective_user an Update built from it would have.
+    """
+    for field, value in data.items():
+        if field == "update_id" or not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat.get("id")
+        user = value.get("from") or value.get("user")
+        if user:
+            return user.get("id")
+    return None
+
+
+class WebhookServer:
+    """
+    Receives Telegram updates over HTTP and hands them to worker tasks.
+
+    Each POST is checked against the secret token, parsed, and pushed into the
+    bounded queue of one of `workers` tasks calling `process_update(data)`.
+    Updates of one chat always go to the same worker, so they are processed
+    one at a time and in order, as with polling; conversations rely on that.
+    When a queue is full the request waits up to `enqueue_timeout` seconds
+    and is then refused with 503, so Telegram backs off and retries later.
+    """
+
+    def __init__(self, process_update, *, secret_token: str, listen: str = "127.0.0.1",
+                 port: int = 8443, path: str = "/webhook", workers: int = 4,
+                 queue_size: int = 100, enqueue_timeout: float = 5.0,
+                 read_timeout: float = 10.0, idle_timeout: float = 120.0):
+        if not secret_token:
+            # Without it anyone who can reach the port could post forged updates
+            raise ValueError("The webhook server needs a secret token")
+        self.process_update = process_update
+        self.secret_token = secret_token
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.enqueue_timeout = enqueue_timeout
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.queues = [asyncio.Queue(maxsize=max(1, queue_size // workers)) for _ in range(workers)]
+        self._server = None
+        self._worker_tasks = []
+        self._writers = set()
+
+    def qsize(self) -> int:
+        """Updates waiting in all worker queues."""
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def start(self) -> None:
+        """Start the worker tasks and begin accepting connections."""
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(queue), name=f"webhook-worker-{n}")
+            for n, queue in enumerate(self.queues)
+        ]
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        if not self.port:
+            # Port 0 means "any free port"; expose the one we got
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop accepting updates, drain the queue and stop the workers."""
+        if self._server:
+            self._server.close()
+            # Keep-alive connections stay open otherwise and wait_closed() would wait for them
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+        for queue in self.queues:
+            await queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            data = await queue.get()
+            try:
+                await self.process_update(data)
+            except Exception as e:
+                print(f"Error processing webhook update: {e}")
+            finally:
+                queue.task_done()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            # Telegram keeps connections alive, so serve requests until the peer closes
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Error in webhook connection: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            return False
+        if not request_line:
+            return False
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            await self._respond(writer, 400, keep_alive=False)
+            return False
+
+        try:
+            headers = await asyncio.wait_for(self._read_headers(reader), self.read_timeout)
+        except asyncio.TimeoutError:
+            await self._respond(writer, 408, keep_alive=False)
+            return False
+
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        if "content-length" not in headers:
+            if method == "POST":
+                await self._respond(writer, 411, keep_alive=False)
+                return False
+            length = 0
+        else:
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                length = -1
+            if length < 0:
+                await self._respond(writer, 400, keep_alive=False)
+                return False
+        if length > MAX_BODY_BYTES:
+            await self._respond(writer, 413, keep_alive=False)
+            return False
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.read_timeout) if length else b""
+        except asyncio.TimeoutError:
+            await self._respond(writer, 408, keep_alive=False)
+            return False
+
+        status = await self._accept(method, target, headers, body)
+        await self._respond(writer, status, keep_alive=keep_alive)
+        return keep_alive
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> dict:
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    async def _accept(self, method: str, target: str, headers: dict, body: bytes) -> int:
+        """Validate one request and enqueue its update. Returns the HTTP status."""
+        if target.split("?", 1)[0] != self.path:
+            return 404
+        if method != "POST":
+            return 405
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, ""), self.secret_token):
+            metrics.inc("webhook_updates_total", status="forbidden")
+            return 403
+        try:
+            data = json.loads(body)
+        except ValueError:
+            metrics.inc("webhook_updates_total", status="invalid")
+            return 400
+        if not isinstance(data, dict):
+            metrics.inc("webhook_updates_total", status="invalid")
+            return 400
+
+        key = route_key(data)
+        queue = self.queues[hash(key if key is not None else data.get("update_id")) % len(self.queues)]
+        try:
+            queue.put_nowait(data)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(queue.put(data), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                metrics.inc("webhook_updates_total", status="rejected")
+                return 503
+        metrics.inc("webhook_updates_total", status="accepted")
+        return 200
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, keep_alive: bool) -> None:
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Length: 0",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
@@ -0,0 +1,80 @@
+# Worker Client - Run jobs from the bot's event loop, inline or on the worker processes
+import asyncio
+import json
+import time
+from config import WORKER_MODE, JOB_POLL_INTERVAL, JOB_WAIT_TIMEOUT
+from database.models import SessionLocal
+from database.job_queue import JobQueue, DONE, FAILED
+from workers.tasks import TaskError, MAX_ATTEMPTS, DEFAULT_MAX_ATTEMPTS, run_task
+from utils import metrics
+
+
+class JobFailed(Exception):
+    """The job failed; the message is safe to show to the user."""
+
+
+async def run_job(kind: str, payload: dict, on_progress=None) -> dict:
+    """
+    Run a job and return its result. With WORKER_MODE=queue the job goes
+    through the jobs table and this coroutine polls until a worker process
+    finishes it; otherwise it runs in a thread of this process. While it runs,
+    `await on_progress(progress)` is called whenever the task reports progress.
+    """
+    metrics.inc("jobs_submitted_total", kind=kind, mode=WORKER_MODE)
+    if WORKER_MODE == "queue":
+        return await _run_queued(kind, payload, on_progress)
+    try:
+        if on_progress is None:
+            return await asyncio.to_thread(run_task, kind, payload)
+        return await _run_inline_with_progress(kind, payload, on_progress)
+    except TaskError as e:
+        raise JobFailed(str(e)) from e
+
+
+async def _run_inline_with_progress(kind: str, payload: dict, on_progress) -> dict:
+    # The task thread only stores its latest report; it is forwarded from the event loop
+    latest = {}
+    task = asyncio.ensure_future(asyncio.to_thread(
+        run_task, kind, payload, lambda progress: latest.update(progress=progress)))
+    reported = None
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=JOB_POLL_INTERVAL)
+        if done:
+            return task.result()
+        progress = latest.get("progress")
+        if progress is not None and progress is not reported:
+            reported = progress
+            await on_progress(progress)
+
+
+async def _run_queued(kind: str, payload: dict, on_progress=None) -> dict:
+    db = SessionLocal()
+    try:
+        job_id = JobQueue.enqueue(db, kind, payload, max_attempts=MAX_ATTEMPTS.get(kind, DEFAULT_MAX_ATTEMPTS)).id
+    finally:
+        db.close()
+
+    reported = None
+    deadline = time.monotonic() + JOB_WAIT_TIMEOUT
+    while True:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        db = SessionLocal()
+        try:
+            job = JobQueue.get(db, job_id)
+            if job is None:
+                raise JobFailed("The job was lost. Please try again.")
+            status, result, error, progress = job.status, job.result, job.error, job.progress
+            # Without running workers the job would be awaited forever, holding its caller
+            # (e.g. a generation slot); give up unless a live worker has it
+            if status not in (DONE, FAILED) and time.monotonic() > deadline and JobQueue.abandon(
+                    db, job_id, "no worker picked the job up in time"):
+                raise JobFailed("The server is busy right now. Please try again later.")
+        finally:
+            db.close()
+        if status == DONE:
+            return json.loads(result)
+        if status == FAILED:
+            raise JobFailed(error or "Job failed")
+        if on_progress is not None and progress and progress != reported:
+            reported = progress
+            await on_progress(json.loads(progress))
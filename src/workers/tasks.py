@@ -0,0 +1,228 @@
+# Worker Tasks - Job bodies shared by the inline path and the worker processes
+import contextlib
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from config import JOB_RETENTION_DAYS
+from database.models import SessionLocal, Project, User
+from database.crud import UserService, ProjectService
+from database.exports import EXPORTS, FORMATS, write_export
+from database.job_queue import JobQueue
+from utils.storage import StorageManager
+from utils import tracing
+
+GENERATE = "generate"
+ARCHIVE = "archive"
+STORAGE_GC = "storage_gc"
+EXPORT = "export"
+PURGE = "purge"
+
+# Storage entries younger than this are never collected: they may belong to a
+# generation that has written its files but not yet committed its project row
+GC_MIN_AGE_SECONDS = 3600
+# Projects deleted per transaction by a purge
+PURGE_BATCH_SIZE = 200
+
+
+class TaskError(Exception):
+    """A job failure with a message fit for the user. Never retried."""
+
+
+@tracing.traced("task.generate")
+def generate_project(payload: dict, progress) -> dict:
+    """Generate, store and compress a project for payload["telegram_id"]."""
+    from ai_generator.gemini_generator import get_generator
+
+    project_name = payload["project_name"]
+    description = payload["description"]
+    db = SessionLocal()
+    try:
+        user = UserService.get_user_by_telegram_id(db, payload["telegram_id"])
+        if user is None:
+            raise TaskError("User not found. Please use /start first.")
+
+        project_files = get_generator().generate_project_files(project_name, description)
+        if not project_files or not project_files.get('structure'):
+            raise TaskError("Error generating project. Please try again with a different description.")
+
+        # Files are written to a staging directory and renamed into place under the
+        # new project's id just before the project row is committed
+        staging_dir = StorageManager.create_staging_directory()
+        try:
+            if not StorageManager.save_project_files(staging_dir, project_files['structure']):
+                raise TaskError("Error saving project files. Please try again.")
+            db_project = ProjectService.create_project(
+                db,
+                user_id=user.id,
+                name=project_name,
+                description=description,
+                files=project_files['structure'],
+                place_files=lambda project_id: StorageManager.publish_project_directory(
+                    staging_dir, project_id, project_name),
+            )
+        finally:
+            if os.path.isdir(staging_dir):
+                StorageManager.delete_project_directory(staging_dir)
+
+        # The project is committed; from here on a failure must not fail the job, or it
+        # would be reported as an error although the project exists. A missing archive
+        # is rebuilt by the ARCHIVE job on first download.
+        try:
+            zip_path = StorageManager.compress_project(db_project.file_path)
+            if zip_path:
+                ProjectService.update_project_zip(db, db_project.id, zip_path)
+        except Exception as e:
+            db.rollback()
+            print(f"Archive of project {db_project.id} not built: {e}")
+
+        return {
+            "project_id": db_project.id,
+            "user_id": user.id,
+            "summary": project_files.get('summary', 'Project generated successfully!'),
+        }
+    finally:
+        db.close()
+
+
+@tracing.traced("task.archive")
+def archive_project(payload: dict, progress) -> dict:
+    """(Re)build the ZIP of payload["project_id"]."""
+    db = SessionLocal()
+    try:
+        project = ProjectService.get_project(db, payload["project_id"])
+        if project is None:
+            raise TaskError("Project not found.")
+        zip_path = StorageManager.compress_project(project.file_path)
+        if not zip_path:
+            raise TaskError("Error preparing project for download.")
+        old_zip = project.zip_path
+        ProjectService.update_project_zip(db, project.id, zip_path)
+        db.commit()
+        if old_zip and old_zip != zip_path and os.path.exists(old_zip):
+            os.remove(old_zip)
+        return {"zip_path": zip_path, "user_id": project.user_id}
+    finally:
+        db.close()
+
+
+@tracing.traced("task.storage_gc")
+def collect_storage(payload: dict, progress) -> dict:
+    """
+    Remove project directories and archives no project refers to, fail jobs
+    whose workers died on their last attempt and purge old finished jobs.
+    """
+    db = SessionLocal()
+    try:
+        referenced = set()
+        for file_path, zip_path in db.query(Project.file_path, Project.zip_path).yield_per(1000):
+            referenced.add(os.path.abspath(file_path))
+            if zip_path:
+                referenced.add(os.path.abspath(zip_path))
+
+        removed = 0
+        cutoff = time.time() - payload.get("min_age_seconds", GC_MIN_AGE_SECONDS)
+        for path, mtime in StorageManager.iter_storage_entries():
+            path = os.path.abspath(path)
+            if path in referenced or mtime > cutoff:
+                continue
+            if os.path.isdir(path):
+                StorageManager.delete_project_directory(path)
+            else:
+                os.remove(path)
+            removed += 1
+
+        expired = JobQueue.recover_expired(db)
+        purged = JobQueue.purge_finished(db, timedelta(days=JOB_RETENTION_DAYS))
+        return {"removed": removed, "expired_jobs": expired, "purged_jobs": purged}
+    finally:
+        db.close()
+
+
+@tracing.traced("task.export")
+def export_data(payload: dict, progress) -> dict:
+    """Write payload["entity"] (users, projects) as payload["format"] (csv, jsonl) to a file."""
+    entity, fmt = payload["entity"], payload["format"]
+    if entity not in EXPORTS or fmt not in FORMATS:
+        raise TaskError(f"Unknown export: {entity}.{fmt}")
+    path = StorageManager.create_export_path(f"{entity}.{fmt}")
+    db = SessionLocal()
+    try:
+        rows = write_export(db, entity, fmt, path, progress)
+    except Exception:
+        # The file may not have been created yet; keep the original error
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        raise
+    finally:
+        db.close()
+    return {"path": path, "rows": rows}
+
+
+def _purge_filters(payload: dict) -> list:
+    if "telegram_id" in payload:
+        return [User.telegram_id == payload["telegram_id"]]
+    if payload.get("banned"):
+        return [User.is_banned.is_(True)]
+    if "older_than_days" in payload:
+        return [Project.created_at < datetime.utcnow() - timedelta(days=payload["older_than_days"])]
+    raise TaskError("Nothing to purge: no filter given.")
+
+
+@tracing.traced("task.purge")
+def purge_projects(payload: dict, progress) -> dict:
+    """
+    Delete the projects of payload["telegram_id"], of banned users (payload["banned"])
+    or older than payload["older_than_days"], PURGE_BATCH_SIZE at a time. Each batch's
+    rows are committed before its files go, so a crash leaves only files for GC.
+    """
+    filters = _purge_filters(payload)
+    db = SessionLocal()
+    try:
+        total = db.query(func.count(Project.id)).outerjoin(User, Project.user_id == User.id).filter(*filters).scalar()
+        deleted = 0
+        last_id = 0
+        while True:
+            batch = (
+                db.query(Project.id, Project.user_id, Project.file_path, Project.zip_path)
+                .outerjoin(User, Project.user_id == User.id)
+                .filter(*filters, Project.id > last_id)
+                .order_by(Project.id).limit(PURGE_BATCH_SIZE).all()
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            ProjectService.delete_projects(db, [(row.id, row.user_id) for row in batch])
+            for row in batch:
+                StorageManager.delete_project_files(row.file_path, row.zip_path)
+            deleted += len(batch)
+            progress({"deleted": deleted, "total": total})
+        return {"deleted": deleted}
+    finally:
+        db.close()
+
+
+# Attempts per job in queue mode. A generation commits its project before it returns, so a
+# retry (or a second worker taking over an expired lease) would call Gemini again and insert
+# a duplicate project; it runs at most once.
+MAX_ATTEMPTS = {GENERATE: 1}
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+# kind -> task(payload, progress) -> result; progress(dict) reports how far a long task
+# has come and may be called often; results must be JSON-serializable
+TASKS = {
+    GENERATE: generate_project,
+    ARCHIVE: archive_project,
+    STORAGE_GC: collect_storage,
+    EXPORT: export_data,
+    PURGE: purge_projects,
+}
+
+
+def _ignore_progress(progress: dict) -> None:
+    pass
+
+
+def run_task(kind: str, payload: dict, progress=None) -> dict:
+    return TASKS[kind](payload, progress or _ignore_progress)
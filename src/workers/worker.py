@@ -0,0 +1,190 @@
+# Worker Processes - Claim and run jobs from the jobs table
+#
+# Usage (from src/, next to a bot running with WORKER_MODE=queue):
+#   python -m workers.worker                    # WORKER_PROCESSES worker processes
+#   python -m workers.worker --processes 4 --kinds generate,archive
+#
+# The supervisor restarts crashed workers and schedules storage GC every
+# STORAGE_GC_INTERVAL seconds. Jobs held by a worker that died are picked up
+# again once their lease expires.
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from config import (
+    WORKER_PROCESSES, JOB_LEASE_SECONDS, JOB_HEARTBEAT_SECONDS, JOB_POLL_INTERVAL,
+    STORAGE_GC_INTERVAL, WORKER_METRICS_PORT, METRICS_ADDR, ensure_directories,
+)
+from database.models import SessionLocal, Job, get_engine
+from database.migrations import migrate
+from database.job_queue import JobQueue, QUEUED, RUNNING
+from workers.tasks import TaskError, STORAGE_GC, run_task
+from utils import metrics
+
+# Seconds between progress writes of one job
+PROGRESS_INTERVAL = 1.0
+
+
+def _heartbeat(job_id: int, worker_id: str, done: threading.Event, lost: threading.Event) -> None:
+    while not done.wait(JOB_HEARTBEAT_SECONDS):
+        db = SessionLocal()
+        try:
+            if not JobQueue.heartbeat(db, job_id, worker_id, JOB_LEASE_SECONDS):
+                lost.set()
+                return
+        except Exception as e:
+            print(f"Heartbeat for job {job_id} failed: {e}")
+        finally:
+            db.close()
+
+
+def _progress_reporter(job_id: int, worker_id: str):
+    """progress callback storing the latest report on the job, at most every PROGRESS_INTERVAL seconds."""
+    last = [0.0]
+
+    def report(progress: dict) -> None:
+        now = time.monotonic()
+        if now - last[0] < PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        db = SessionLocal()
+        try:
+            JobQueue.set_progress(db, job_id, worker_id, progress)
+        except Exception as e:
+            print(f"Progress of job {job_id} not recorded: {e}")
+        finally:
+            db.close()
+
+    return report
+
+
+def run_one(worker_id: str, kinds: list = None) -> bool:
+    """Claim and run one job. Returns False if there was nothing to do."""
+    db = SessionLocal()
+    try:
+        job = JobQueue.claim(db, worker_id, JOB_LEASE_SECONDS, kinds)
+        if job is None:
+            return False
+        job_id, kind, payload = job.id, job.kind, job.payload
+    finally:
+        db.close()
+
+    done, lost = threading.Event(), threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_id, worker_id, done, lost), daemon=True)
+    heartbeat.start()
+    try:
+        result = run_task(kind, json.loads(payload), _progress_reporter(job_id, worker_id))
+    except TaskError as e:
+        outcome = ("fail", str(e), False)
+    except Exception as e:
+        print(f"Job {job_id} ({kind}) raised: {e}")
+        outcome = ("fail", f"{type(e).__name__}: {e}", True)
+    else:
+        outcome = ("complete", result, None)
+    finally:
+        done.set()
+        heartbeat.join()
+
+    db = SessionLocal()
+    try:
+        if outcome[0] == "complete":
+            recorded = JobQueue.complete(db, job_id, worker_id, outcome[1])
+        else:
+            recorded = JobQueue.fail(db, job_id, worker_id, outcome[1], retry=outcome[2])
+    finally:
+        db.close()
+    if not recorded or lost.is_set():
+        # The lease ran out mid-job and another worker has taken over
+        print(f"Job {job_id} lease lost; result of {worker_id} discarded")
+    return True
+
+
+def run_worker(worker_id: str, kinds: list = None, poll_interval: float = JOB_POLL_INTERVAL,
+               stop: threading.Event = None) -> None:
+    """Claim jobs until `stop` is set, sleeping `poll_interval` whenever the queue is empty."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            busy = run_one(worker_id, kinds)
+        except Exception as e:
+            print(f"Worker {worker_id} error: {e}")
+            busy = False
+        if not busy:
+            stop.wait(poll_interval)
+
+
+def _worker_process(index: int, kinds: list) -> None:
+    # Ctrl+C reaches the whole process group; only the supervisor reacts to it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    print(f"Worker {worker_id} started")
+    # Job counters and timings live in this process, not in the bot's exporter
+    if WORKER_METRICS_PORT:
+        metrics.start_http_server(WORKER_METRICS_PORT + index, METRICS_ADDR)
+        print(f"Worker {worker_id} serving metrics on http://{METRICS_ADDR}:{WORKER_METRICS_PORT + index}/metrics")
+    run_worker(worker_id, kinds, stop=stop)
+
+
+def _schedule_gc() -> None:
+    db = SessionLocal()
+    try:
+        pending = db.query(Job.id).filter(Job.kind == STORAGE_GC, Job.status.in_((QUEUED, RUNNING))).first()
+        if pending is None:
+            JobQueue.enqueue(db, STORAGE_GC, {}, max_attempts=1)
+    finally:
+        db.close()
+
+
+def supervise(processes: int, kinds: list = None) -> None:
+    """Run `processes` worker processes until SIGINT/SIGTERM, restarting any that die."""
+    ctx = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stopping.set())
+
+    def start(index):
+        process = ctx.Process(target=_worker_process, args=(index, kinds), name=f"worker-{index}")
+        process.start()
+        return process
+
+    workers = [start(index) for index in range(processes)]
+    next_gc = time.monotonic()
+    while not stopping.wait(1.0):
+        for index, process in enumerate(workers):
+            if not process.is_alive():
+                print(f"Worker {index} exited with {process.exitcode}; restarting")
+                workers[index] = start(index)
+        if STORAGE_GC_INTERVAL > 0 and time.monotonic() >= next_gc and (not kinds or STORAGE_GC in kinds):
+            _schedule_gc()
+            next_gc = time.monotonic() + STORAGE_GC_INTERVAL
+
+    print("Stopping workers...")
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        # Workers finish their current job first; its lease bounds how long that may take
+        process.join(JOB_LEASE_SECONDS)
+        if process.is_alive():
+            process.kill()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run job worker processes")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--kinds", help="comma-separated job kinds to run (default: all)")
+    args = parser.parse_args(argv)
+
+    ensure_directories()
+    print(f"Database schema at version {migrate(get_engine())}")
+    kinds = [kind.strip() for kind in args.kinds.split(",")] if args.kinds else None
+    supervise(args.processes, kinds)
+
+
+if __name__ == "__main__":
+    main()